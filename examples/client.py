@@ -2,7 +2,9 @@ import asyncio
 import json
 import logging
 import os
+import struct
 import sys
+import time
 import wave
 from dataclasses import dataclass
 from pathlib import Path
@@ -23,6 +25,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Timestamped frame protocol, see app/utils/frame_protocol.py on the bridge
+FRAME_PROTOCOL_VERSION: Final[int] = 1
+FRAME_HEADER: Final = struct.Struct("<BBIq")
+CLOCK_REPLY_PAYLOAD: Final = struct.Struct("<qq")
+FRAME_AUDIO: Final[int] = 1
+FRAME_CLOCK_PROBE: Final[int] = 2
+FRAME_CLOCK_REPLY: Final[int] = 3
+FRAME_PLAYBACK_STARTED: Final[int] = 4
+
+
+def monotonic_us() -> int:
+    return time.monotonic_ns() // 1000
+
 
 @dataclass
 class AudioStreams:
@@ -41,6 +56,9 @@ class Config(BaseModel):
     output_channels: int = Field(default=1, description="Number of output channels")
     chunk_size: int = Field(default=1280, description="Audio chunk size in bytes")
     room: str = Field(default="livingroom", description="Room identifier")
+    frame_protocol_version: int = Field(
+        default=0, description="0 sends raw audio, 1 enables timestamped frames for latency measurement"
+    )
     url: str = Field(default="ws://192.168.8.20:8000/client_control", description="WebSocket URL")
     output_device_index: int = Field(default=1, description="Output device index")
     input_device_index: int = Field(default=1, description="Input device index")
@@ -75,12 +93,18 @@ def load_wav_file(file_path: Path) -> bytes:
 
 class WebSocketManager:
     RECONNECT_DELAY: Final[float] = 1.0
+    PLAYBACK_SLICE_BYTES: Final[int] = 3200  # 100 ms at 16 kHz
 
     def __init__(self, config: Config, streams: AudioStreams, sounds: dict[str, bytes]) -> None:
         self.config = config
         self.streams = streams
         self.sounds = sounds
         self._running = True
+        self._sequence = 0
+        self._awaiting_reply_audio = False
+        # Audio waiting to be played; dropped on "stop_playback" when the bridge handles a barge-in
+        self._playback: asyncio.Queue[bytes] = asyncio.Queue()
+        self._playback_generation = 0
 
     async def start(self) -> None:
         while self._running:
@@ -99,11 +123,18 @@ class WebSocketManager:
         self.streams.cleanup()
 
     async def _handle_connection(self, ws: websockets.asyncio.client.ClientConnection) -> None:
-        await asyncio.gather(self._send_audio(ws), self._receive_commands(ws))
+        player = asyncio.create_task(self._play_audio())
+        try:
+            await asyncio.gather(self._send_audio(ws), self._receive_commands(ws))
+        finally:
+            player.cancel()
 
     async def _send_audio(self, ws: websockets.asyncio.client.ClientConnection) -> None:
         while self._running:
             audio_data = self.streams.input.read(self.config.chunk_size, exception_on_overflow=False)
+            if self.config.frame_protocol_version >= FRAME_PROTOCOL_VERSION:
+                self._sequence = (self._sequence + 1) % 2**32
+                audio_data = self._frame(FRAME_AUDIO, self._sequence, monotonic_us(), audio_data)
             await ws.send(audio_data)
             # Small yield to prevent blocking the event loop
             await asyncio.sleep(0.001)
@@ -113,15 +144,59 @@ class WebSocketManager:
             try:
                 message = await ws.recv()
                 if isinstance(message, bytes):
-                    self.streams.output.write(message)
+                    await self._handle_binary(ws, message)
+                elif message == "stop_playback":
+                    self._playback_generation += 1
+                    while not self._playback.empty():
+                        self._playback.get_nowait()
                 elif sound := self.sounds.get(message):
-                    self.streams.output.write(sound)
+                    if message == "stop_listening":
+                        self._awaiting_reply_audio = True
+                    self._playback.put_nowait(sound)
             except websockets.ConnectionClosed:
                 break
 
+    async def _handle_binary(self, ws: websockets.asyncio.client.ClientConnection, message: bytes) -> None:
+        if self.config.frame_protocol_version < FRAME_PROTOCOL_VERSION:
+            self._playback.put_nowait(message)
+            return
+        receive_us = monotonic_us()
+        _, frame_type, sequence, timestamp_us = FRAME_HEADER.unpack_from(message)
+        if frame_type == FRAME_CLOCK_PROBE:
+            payload = CLOCK_REPLY_PAYLOAD.pack(timestamp_us, receive_us)
+            await ws.send(self._frame(FRAME_CLOCK_REPLY, sequence, monotonic_us(), payload))
+        elif frame_type == FRAME_AUDIO:
+            if self._awaiting_reply_audio:
+                self._awaiting_reply_audio = False
+                await ws.send(self._frame(FRAME_PLAYBACK_STARTED, sequence, monotonic_us()))
+            self._playback.put_nowait(message[FRAME_HEADER.size :])
+
+    async def _play_audio(self) -> None:
+        while self._running:
+            audio = await self._playback.get()
+            generation = self._playback_generation
+            # Written in slices so a stop_playback takes effect within one slice
+            for start in range(0, len(audio), self.PLAYBACK_SLICE_BYTES):
+                if generation != self._playback_generation:
+                    break
+                await asyncio.to_thread(self.streams.output.write, audio[start : start + self.PLAYBACK_SLICE_BYTES])
+
+    @staticmethod
+    def _frame(frame_type: int, sequence: int, timestamp_us: int, payload: bytes = b"") -> bytes:
+        return FRAME_HEADER.pack(FRAME_PROTOCOL_VERSION, frame_type, sequence, timestamp_us) + payload
+
     def _get_config_json(self) -> str:
         return json.dumps(
-            self.config.model_dump(include={"samplerate", "input_channels", "output_channels", "chunk_size", "room"})
+            self.config.model_dump(
+                include={
+                    "samplerate",
+                    "input_channels",
+                    "output_channels",
+                    "chunk_size",
+                    "room",
+                    "frame_protocol_version",
+                }
+            )
         )
 
 
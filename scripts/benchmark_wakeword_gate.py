@@ -0,0 +1,108 @@
+"""Compare wakeword CPU cost and detection recall with and without the pre-gate.
+
+Each recorded wakeword clip (16 kHz mono int16 WAV) is embedded after a stretch of
+low-level noise that stands in for an idle room, then streamed frame by frame through
+openwakeword once ungated and once through the WakewordGate.
+
+    python scripts/benchmark_wakeword_gate.py --model assets/hey_nova.onnx --name hey_nova clips/*.wav
+"""
+
+import argparse
+import asyncio
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import openwakeword
+
+from app.main import create_wakeword_gate
+from app.utils import client_config, config, inference, silero_vad, wakeword_gate
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1280
+
+
+def load_clip(path: Path) -> np.ndarray:
+    with wave.open(str(path)) as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:  # noqa: PLR2004
+            raise ValueError(f"{path} must be 16 kHz mono 16 bit")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def idle_noise(seconds: float, level: float, rng: np.random.Generator) -> np.ndarray:
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * level).astype(np.int16)
+
+
+async def run_stream(
+    model: openwakeword.Model,
+    name: str,
+    threshold: float,
+    audio: np.ndarray,
+    gate: wakeword_gate.WakewordGate | None,
+) -> tuple[bool, float]:
+    model.reset()
+    detected = False
+    start = time.process_time()
+    for i in range(0, len(audio) - CHUNK_SIZE + 1, CHUNK_SIZE):
+        frame = audio[i : i + CHUNK_SIZE]
+        if gate is not None:
+            gated = await gate.process(frame)
+            if gated is None:
+                continue
+            frame = gated
+        if model.predict(frame)[name] >= threshold:
+            detected = True
+    return detected, time.process_time() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clips", nargs="+", type=Path, help="Recorded wakeword clips")
+    parser.add_argument("--model", default="assets/hey_nova.onnx")
+    parser.add_argument("--name", default="hey_nova")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--idle-seconds", type=float, default=60.0)
+    parser.add_argument("--noise-level", type=float, default=20.0, help="RMS of the idle room noise")
+    parser.add_argument("--mode", type=wakeword_gate.GateMode, default=wakeword_gate.GateMode.ENERGY)
+    parser.add_argument("--rms-threshold", type=float, default=100.0)
+    args = parser.parse_args()
+
+    model = openwakeword.Model(wakeword_models=[args.model], inference_framework="onnx")
+    config_obj = config.Config(
+        wakeword_gate_mode=args.mode,
+        wakeword_gate_rms_threshold=args.rms_threshold,
+        wakewords=[config.WakewordModel(name=args.name, path_or_name=args.model, threshold=args.threshold)],
+    )
+    client_conf = client_config.ClientConfig(
+        samplerate=SAMPLE_RATE, input_channels=1, output_channels=1, chunk_size=CHUNK_SIZE, room="benchmark"
+    )
+    rng = np.random.default_rng(0)
+
+    baseline_hits = gated_hits = 0
+    baseline_cpu = gated_cpu = 0.0
+    for clip_path in args.clips:
+        audio = np.concatenate(
+            (idle_noise(args.idle_seconds, args.noise_level, rng), load_clip(clip_path), idle_noise(1.0, 0.0, rng))
+        )
+        # Built like a session's gate, so the VAD sees the same windows as in production
+        vad = silero_vad.SileroVad(threshold=config_obj.vad_threshold, trigger_level=1)
+        session_inference = inference.LocalInference(model, vad, config_obj.wakeword_models)
+        gate = create_wakeword_gate(config_obj, client_conf, session_inference)
+        hit, cpu = asyncio.run(run_stream(model, args.name, args.threshold, audio, gate=None))
+        baseline_hits += hit
+        baseline_cpu += cpu
+        hit, cpu = asyncio.run(run_stream(model, args.name, args.threshold, audio, gate=gate))
+        gated_hits += hit
+        gated_cpu += cpu
+        print(f"{clip_path.name}: scored {gate.frames_scored}/{gate.frames_seen} frames, detected={bool(hit)}")
+
+    idle_minutes = len(args.clips) * args.idle_seconds / 60
+    print(f"CPU per idle minute: ungated {baseline_cpu / idle_minutes:.3f}s, gated {gated_cpu / idle_minutes:.3f}s")
+    print(f"Detections: ungated {baseline_hits}/{len(args.clips)}, gated {gated_hits}/{len(args.clips)}")
+    if baseline_hits:
+        print(f"Recall relative to ungated: {gated_hits / baseline_hits:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""Headless load generator for the /client_control endpoint.
+
+Opens many concurrent satellite sessions against one bridge and streams audio at real-time
+pace. By default the bridge runs in-process against local stand-ins for the STT and TTS
+APIs and a minimal MQTT broker that also plays the assistant, so the only thing measured
+is the bridge itself:
+
+    python scripts/load_generator.py --sessions 200 --duration 120 \\
+        --wakeword-wav clips/hey_nova.wav --command-wav clips/turn_on_the_light.wav
+
+Reported per stage (client view, p50/p99):
+    wakeword    end of injected wakeword -> "start_listening"
+    endpoint    end of spoken command    -> "stop_listening"
+    response    "stop_listening"         -> first reply audio frame
+    transport   satellite -> bridge audio delay measured by the bridge (frame protocol v1)
+plus frames dropped because the sender fell behind real time, frames the bridge saw as lost,
+rejected connections and CPU time and resident memory per session.
+
+Without --wakeword-wav no commands are triggered and only the idle load is measured. CPU
+and memory include this generator when the bridge runs in-process; use --url to target an
+external bridge (its config must point at --stub-host/--stt-port/--tts-port/--mqtt-port).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import socket
+import struct
+import tempfile
+import time
+import wave
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+import numpy as np
+import uvicorn
+import websockets
+import websockets.asyncio.client
+import yaml
+from fastapi import FastAPI, Request, Response
+from private_assistant_commons import messages
+
+from app.utils import frame_protocol
+
+logger = logging.getLogger("load_generator")
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1280
+FRAME_SECONDS = CHUNK_SIZE / SAMPLE_RATE
+INPUT_TOPIC = "assistant/comms_bridge/load/input"
+PERCENTILES = (50, 99)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def load_wav(path: Path) -> np.ndarray:
+    with wave.open(str(path)) as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:  # noqa: PLR2004
+            raise ValueError(f"{path} must be 16 kHz mono 16 bit")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def rss_bytes() -> int:
+    """Current resident set size, falls back to the peak where /proc is unavailable."""
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+# --- MQTT broker stand-in -------------------------------------------------------------
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    pattern_parts, topic_parts = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part not in ("+", topic_parts[i])):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+def encode_remaining_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(encoded)
+
+
+def mqtt_string(value: str) -> bytes:
+    raw = value.encode()
+    return struct.pack("!H", len(raw)) + raw
+
+
+class StubMqttBroker:
+    """Just enough of MQTT 3.1.1 for aiomqtt, doubling as the assistant.
+
+    Every ClientRequest published on the input topic is answered with a Response on the
+    request's output topic after ``assistant_delay`` seconds. Deliveries use QoS 0.
+    """
+
+    def __init__(self, assistant_delay: float, reply_text: str) -> None:
+        self.assistant_delay = assistant_delay
+        self.reply_text = reply_text
+        self.subscriptions: dict[asyncio.StreamWriter, set[str]] = {}
+        self.requests_answered = 0
+        self._answers: set[asyncio.Task] = set()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.subscriptions[writer] = set()
+        try:
+            while True:
+                header = (await reader.readexactly(1))[0]
+                length, multiplier = 0, 1
+                while True:
+                    byte = (await reader.readexactly(1))[0]
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not byte & 0x80:
+                        break
+                body = await reader.readexactly(length)
+                if not await self._dispatch(header, body, writer):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.subscriptions.pop(writer, None)
+            writer.close()
+
+    async def _dispatch(self, header: int, body: bytes, writer: asyncio.StreamWriter) -> bool:
+        packet_type = header >> 4
+        if packet_type == 1:  # CONNECT
+            writer.write(b"\x20\x02\x00\x00")
+        elif packet_type == 3:  # PUBLISH  # noqa: PLR2004
+            qos = (header >> 1) & 0x03
+            topic_length = struct.unpack_from("!H", body)[0]
+            topic = body[2 : 2 + topic_length].decode()
+            offset = 2 + topic_length
+            if qos:
+                writer.write(b"\x40\x02" + body[offset : offset + 2])
+                offset += 2
+            await self.publish(topic, body[offset:])
+        elif packet_type == 8:  # SUBSCRIBE  # noqa: PLR2004
+            packet_id, offset, granted = body[:2], 2, bytearray()
+            while offset < len(body):
+                topic_length = struct.unpack_from("!H", body, offset)[0]
+                self.subscriptions[writer].add(body[offset + 2 : offset + 2 + topic_length].decode())
+                offset += 2 + topic_length + 1
+                granted.append(0)
+            writer.write(b"\x90" + encode_remaining_length(2 + len(granted)) + packet_id + granted)
+        elif packet_type == 10:  # UNSUBSCRIBE  # noqa: PLR2004
+            offset = 2
+            while offset < len(body):
+                topic_length = struct.unpack_from("!H", body, offset)[0]
+                self.subscriptions[writer].discard(body[offset + 2 : offset + 2 + topic_length].decode())
+                offset += 2 + topic_length
+            writer.write(b"\xb0\x02" + body[:2])
+        elif packet_type == 12:  # PINGREQ  # noqa: PLR2004
+            writer.write(b"\xd0\x00")
+        elif packet_type == 14:  # DISCONNECT  # noqa: PLR2004
+            return False
+        await writer.drain()
+        return True
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        packet_body = mqtt_string(topic) + payload
+        packet = b"\x30" + encode_remaining_length(len(packet_body)) + packet_body
+        for writer, patterns in list(self.subscriptions.items()):
+            if any(topic_matches(pattern, topic) for pattern in patterns):
+                writer.write(packet)
+        if topic == INPUT_TOPIC:
+            task = asyncio.create_task(self._answer(payload))
+            self._answers.add(task)
+            task.add_done_callback(self._answers.discard)
+
+    async def _answer(self, payload: bytes) -> None:
+        request = messages.ClientRequest.model_validate_json(payload)
+        await asyncio.sleep(self.assistant_delay)
+        response = messages.Response(text=self.reply_text)
+        self.requests_answered += 1
+        await self.publish(request.output_topic, response.model_dump_json().encode())
+
+
+# --- STT / TTS stand-ins --------------------------------------------------------------
+
+
+def create_speech_stub(stt_delay: float, tts_delay: float, tts_seconds_per_char: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/transcribe")
+    async def transcribe() -> dict:
+        await asyncio.sleep(stt_delay)
+        return {"text": "turn on the light", "message": "ok"}
+
+    @stub.post("/synthesizeSpeech")
+    async def synthesize(request: Request) -> Response:
+        payload = await request.json()
+        await asyncio.sleep(tts_delay)
+        samples = int(len(payload["text"]) * tts_seconds_per_char * payload.get("sample_rate", SAMPLE_RATE))
+        return Response(content=np.zeros(max(samples, 1), dtype=np.int16).tobytes())
+
+    return stub
+
+
+# --- Satellites -----------------------------------------------------------------------
+
+
+@dataclass
+class LoadStats:
+    stages: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    frames_sent: int = 0
+    frames_dropped: int = 0
+    commands_sent: int = 0
+    sessions_connected: int = 0
+    sessions_rejected: int = 0
+
+
+class Satellite:
+    def __init__(  # noqa: PLR0913
+        self,
+        index: int,
+        url: str,
+        stats: LoadStats,
+        background: np.ndarray,
+        wakeword: np.ndarray | None,
+        command: np.ndarray,
+        command_interval: float,
+    ) -> None:
+        self.room = f"load-{index:04d}"
+        self.url = url
+        self.stats = stats
+        self.background = background
+        self.wakeword = wakeword
+        self.command = command
+        self.command_interval = command_interval
+        self._sequence = 0
+        self._wakeword_end: float | None = None
+        self._start_listening_at: float | None = None
+        self._command_end: float | None = None
+        self._stop_listening_at: float | None = None
+
+    def _frames(self, rng: np.random.Generator) -> list[tuple[np.ndarray, str | None]]:
+        """One command cycle: background audio, then optionally wakeword and command."""
+        cycle_frames = max(1, int(self.command_interval / FRAME_SECONDS))
+        start = int(rng.integers(0, max(1, len(self.background) - CHUNK_SIZE)))
+        audio = np.resize(np.roll(self.background, -start), cycle_frames * CHUNK_SIZE)
+        markers: list[str | None] = [None] * cycle_frames
+        if self.wakeword is not None:
+            spoken = np.concatenate((self.wakeword, self.command))
+            begin = max(0, len(audio) - len(spoken) - SAMPLE_RATE)
+            audio[begin : begin + len(spoken)] = spoken[: len(audio) - begin]
+            markers[min((begin + len(self.wakeword)) // CHUNK_SIZE, cycle_frames - 1)] = "wakeword_end"
+            markers[min((begin + len(spoken)) // CHUNK_SIZE, cycle_frames - 1)] = "command_end"
+        return [(audio[i * CHUNK_SIZE : (i + 1) * CHUNK_SIZE], markers[i]) for i in range(cycle_frames)]
+
+    async def run(self, duration: float, start_delay: float) -> None:
+        await asyncio.sleep(start_delay)
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                await ws.send(
+                    json.dumps(
+                        {
+                            "samplerate": SAMPLE_RATE,
+                            "input_channels": 1,
+                            "output_channels": 1,
+                            "chunk_size": CHUNK_SIZE,
+                            "room": self.room,
+                            "frame_protocol_version": frame_protocol.PROTOCOL_VERSION,
+                        }
+                    )
+                )
+                self.stats.sessions_connected += 1
+                receiver = asyncio.create_task(self._receive(ws))
+                try:
+                    await self._send(ws, duration)
+                finally:
+                    receiver.cancel()
+        except websockets.ConnectionClosed as e:
+            if e.rcvd is not None and e.rcvd.code == 1001:  # noqa: PLR2004
+                self.stats.sessions_rejected += 1
+            else:
+                logger.warning("%s: connection closed: %s", self.room, e)
+        except OSError as e:
+            logger.warning("%s: connection failed: %s", self.room, e)
+
+    async def _send(self, ws: websockets.asyncio.client.ClientConnection, duration: float) -> None:
+        loop = asyncio.get_running_loop()
+        rng = np.random.default_rng(abs(hash(self.room)))
+        start = loop.time()
+        frame_index = 0
+        while loop.time() - start < duration:
+            # A wakeword the bridge missed must not be matched with the next cycle's detection
+            self._wakeword_end = self._start_listening_at = None
+            for audio, marker in self._frames(rng):
+                deadline = start + frame_index * FRAME_SECONDS
+                frame_index += 1
+                now = loop.time()
+                if now - deadline > FRAME_SECONDS:
+                    # The sender fell more than a frame behind real time, a satellite would drop it
+                    self.stats.frames_dropped += 1
+                    continue
+                if deadline > now:
+                    await asyncio.sleep(deadline - now)
+                self._sequence += 1
+                await ws.send(
+                    frame_protocol.encode_frame(
+                        frame_protocol.FrameType.AUDIO, self._sequence, frame_protocol.monotonic_us(), audio.tobytes()
+                    )
+                )
+                self.stats.frames_sent += 1
+                if marker == "wakeword_end":
+                    if self._start_listening_at is not None:
+                        # Detected before the clip was fully sent
+                        self.stats.stages["wakeword"].append(0.0)
+                        self._start_listening_at = None
+                    else:
+                        self._wakeword_end = time.monotonic()
+                elif marker == "command_end":
+                    self._command_end = time.monotonic()
+                    self.stats.commands_sent += 1
+                if loop.time() - start >= duration:
+                    return
+
+    async def _receive(self, ws: websockets.asyncio.client.ClientConnection) -> None:
+        async for message in ws:
+            now = time.monotonic()
+            if isinstance(message, str):
+                if message == "start_listening":
+                    if self._wakeword_end is not None:
+                        self.stats.stages["wakeword"].append(now - self._wakeword_end)
+                        self._wakeword_end = None
+                    else:
+                        self._start_listening_at = now
+                elif message == "stop_listening":
+                    self._stop_listening_at = now
+                    if self._command_end is not None:
+                        self.stats.stages["endpoint"].append(now - self._command_end)
+                        self._command_end = None
+                continue
+            frame = frame_protocol.decode_frame(message)
+            if frame.frame_type == frame_protocol.FrameType.CLOCK_PROBE:
+                receive_us = frame_protocol.monotonic_us()
+                payload = frame_protocol.CLOCK_REPLY_PAYLOAD.pack(frame.timestamp_us, receive_us)
+                await ws.send(
+                    frame_protocol.encode_frame(
+                        frame_protocol.FrameType.CLOCK_REPLY, frame.sequence, frame_protocol.monotonic_us(), payload
+                    )
+                )
+            elif frame.frame_type == frame_protocol.FrameType.AUDIO and self._stop_listening_at is not None:
+                self.stats.stages["response"].append(now - self._stop_listening_at)
+                self._stop_listening_at = None
+                await ws.send(
+                    frame_protocol.encode_frame(
+                        frame_protocol.FrameType.PLAYBACK_STARTED, frame.sequence, frame_protocol.monotonic_us()
+                    )
+                )
+
+
+# --- Orchestration --------------------------------------------------------------------
+
+
+def write_bridge_config(args: argparse.Namespace, directory: Path) -> Path:
+    stub = f"http://{args.stub_host}"
+    bridge_config = {
+        "mqtt_server_host": args.stub_host,
+        "mqtt_server_port": args.mqtt_port,
+        "speech_transcription_api": f"{stub}:{args.stt_port}/transcribe",
+        "speech_synthesis_api": f"{stub}:{args.tts_port}/synthesizeSpeech",
+        "input_topic_overwrite": INPUT_TOPIC,
+        "max_sessions": args.sessions,
+        "path_or_name_wakeword_model": args.wakeword_model,
+        "name_wakeword_model": args.wakeword_name,
+    }
+    if args.bridge_config:
+        bridge_config.update(yaml.safe_load(args.bridge_config.read_text()) or {})
+    path = directory / "bridge_config.yaml"
+    path.write_text(yaml.safe_dump(bridge_config))
+    return path
+
+
+async def serve(app: FastAPI | str, port: int) -> tuple[uvicorn.Server, asyncio.Task]:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_size=2**24))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+def summarize(  # noqa: PLR0913
+    stats: LoadStats, bridge_latency: dict, sessions: int, cpu: float, rss_delta: int, duration: float
+):
+    print(f"sessions: {stats.sessions_connected} connected, {stats.sessions_rejected} rejected of {sessions}")
+    print(f"frames: {stats.frames_sent} sent, {stats.frames_dropped} dropped by late sender")
+    print(f"commands: {stats.commands_sent} sent")
+    transport_ms = [s["transport_delay_us"] / 1000 for s in bridge_latency.values() if s["transport_delay_us"]]
+    stages = {name: [v * 1000 for v in values] for name, values in stats.stages.items()}
+    stages["transport"] = transport_ms
+    for name in ("wakeword", "endpoint", "response", "transport"):
+        values = stages.get(name) or []
+        if values:
+            p50, p99 = np.percentile(values, PERCENTILES)
+            print(f"{name:>10}: p50 {p50:8.1f} ms  p99 {p99:8.1f} ms  (n={len(values)})")
+        else:
+            print(f"{name:>10}: no samples")
+    lost = sum(s["frames_lost"] for s in bridge_latency.values())
+    print(f"frames lost in transport (bridge view): {lost}")
+    connected = max(1, stats.sessions_connected)
+    print(f"CPU per session: {cpu / duration / connected * 100:.2f}% of a core")
+    print(f"memory per session: {rss_delta / connected / 2**20:.1f} MiB")
+
+
+async def run(args: argparse.Namespace) -> None:
+    servers: list[tuple[uvicorn.Server, asyncio.Task]] = []
+    mqtt_server: asyncio.Server | None = None
+    try:
+        url = args.url
+        if url is None:
+            broker = StubMqttBroker(args.assistant_delay, args.reply_text)
+            mqtt_server = await asyncio.start_server(broker.handle, args.stub_host, args.mqtt_port)
+            stub = create_speech_stub(args.stt_delay, args.tts_delay, args.tts_seconds_per_char)
+            servers.append(await serve(stub, args.stt_port))
+            if args.tts_port != args.stt_port:
+                servers.append(await serve(stub, args.tts_port))
+            with tempfile.TemporaryDirectory() as tmp:
+                os.environ["PRIVATE_ASSISTANT_API_CONFIG_PATH"] = str(write_bridge_config(args, Path(tmp)))
+                bridge_port = free_port()
+                servers.append(await serve("app.main:app", bridge_port))
+            url = f"ws://127.0.0.1:{bridge_port}/client_control"
+
+        background = (
+            load_wav(args.background_wav)
+            if args.background_wav
+            else (np.random.default_rng(0).standard_normal(SAMPLE_RATE * 10) * args.noise_level).astype(np.int16)
+        )
+        wakeword = load_wav(args.wakeword_wav) if args.wakeword_wav else None
+        command = load_wav(args.command_wav) if args.command_wav else np.zeros(0, dtype=np.int16)
+
+        stats = LoadStats()
+        satellites = [
+            Satellite(i, url, stats, background, wakeword, command, args.command_interval) for i in range(args.sessions)
+        ]
+        rss_before, cpu_before = rss_bytes(), cpu_seconds()
+        await asyncio.gather(
+            *(sat.run(args.duration, start_delay=i * args.ramp_up / args.sessions) for i, sat in enumerate(satellites))
+        )
+        cpu, rss_delta = cpu_seconds() - cpu_before, rss_bytes() - rss_before
+        http_url = url.replace("ws://", "http://").replace("wss://", "https://").rsplit("/", 1)[0]
+        async with httpx.AsyncClient() as client:
+            bridge_latency = (await client.get(f"{http_url}/latency")).json()
+        summarize(stats, bridge_latency, args.sessions, cpu, rss_delta, args.duration + args.ramp_up)
+    finally:
+        for server, task in reversed(servers):
+            server.should_exit = True
+            await task
+        if mqtt_server is not None:
+            mqtt_server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60.0, help="Streaming seconds per session")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which sessions connect")
+    parser.add_argument("--url", help="Target an external bridge instead of an in-process one")
+    parser.add_argument("--bridge-config", type=Path, help="YAML merged into the in-process bridge config")
+    parser.add_argument("--background-wav", type=Path, help="Room audio looped between commands")
+    parser.add_argument("--noise-level", type=float, default=20.0, help="RMS of synthetic background noise")
+    parser.add_argument("--wakeword-wav", type=Path, help="Wakeword clip injected once per command interval")
+    parser.add_argument("--command-wav", type=Path, help="Spoken command following the wakeword")
+    parser.add_argument("--command-interval", type=float, default=20.0)
+    parser.add_argument("--wakeword-model", default="assets/hey_nova.onnx")
+    parser.add_argument("--wakeword-name", default="hey_nova")
+    parser.add_argument("--stt-delay", type=float, default=0.3)
+    parser.add_argument("--tts-delay", type=float, default=0.3)
+    parser.add_argument("--tts-seconds-per-char", type=float, default=0.06)
+    parser.add_argument("--assistant-delay", type=float, default=0.1)
+    parser.add_argument("--reply-text", default="Okay. The light in the living room is on now.")
+    parser.add_argument("--stub-host", default="127.0.0.1")
+    parser.add_argument("--stt-port", type=int, default=free_port())
+    parser.add_argument("--tts-port", type=int, default=free_port())
+    parser.add_argument("--mqtt-port", type=int, default=free_port())
+    args = parser.parse_args()
+    if args.wakeword_wav and not args.command_wav:
+        parser.error("--wakeword-wav needs --command-wav, the bridge only stops listening after speech")
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,37 @@
 #!/usr/bin/env python3
 
 import asyncio
+import dataclasses
 import logging
 import os
 import pathlib
 import sys
-from contextlib import asynccontextmanager, suppress
+import time
+from contextlib import aclosing, asynccontextmanager, suppress
 
 import aiomqtt
+import httpx
 import numpy as np
-import openwakeword
 import pydantic
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from opentelemetry import trace
 from private_assistant_commons import messages
 
 from app.utils import (
+    audio_framer,
     client_config,
+    client_session,
     config,
+    frame_protocol,
+    inference,
+    inference_workers,
     processing_sound,
+    session_memory,
     silero_vad,
     speech_recognition_tools,
     support_utils,
+    tracing,
+    wakeword_gate,
 )
 
 # Configure logging
@@ -48,17 +59,52 @@ def decode_message_payload(payload) -> str | None:
 
 async def listen(client: aiomqtt.Client, sup_util: support_utils.SupportUtils):
     async for message in client.messages:
-        topic_queue = sup_util.mqtt_subscription_to_queue.get(message.topic.value)
         logger.debug("Received message: %s", message)
-        if topic_queue is None:
+        traced_session: client_session.ClientSession | None = None
+        if message.topic.matches(sup_util.config_obj.broadcast_topic):
+            topic_queues = [session.output_queue for session in sup_util.sessions]
+        else:
+            topic_queue = sup_util.mqtt_subscription_to_queue.get(message.topic.value)
+            topic_queues = [] if topic_queue is None else [topic_queue]
+            # Only replies on a room's own topic answer one of its commands
+            traced_session = next((s for s in sup_util.sessions if s.output_queue is topic_queue), None)
+        if not topic_queues:
             logger.warning("%s seems to have no queue. Discarding message.", message.topic)
         else:
             payload_str = decode_message_payload(message.payload)
             if payload_str is not None:
                 try:
-                    await topic_queue.put(messages.Response.model_validate_json(payload_str))
+                    response = messages.Response.model_validate_json(payload_str)
                 except pydantic.ValidationError:
                     logger.error("Message failed validation. %s", payload_str)
+                    continue
+                if traced_session is not None:
+                    tracing.match_response(traced_session.traces, response)
+                for topic_queue in topic_queues:
+                    await topic_queue.put(response)
+
+
+async def reclaim_sessions(sup_util: support_utils.SupportUtils) -> None:
+    config_obj = sup_util.config_obj
+    budget_bytes = int(config_obj.session_memory_budget_mb * 1024 * 1024)
+    while True:
+        await asyncio.sleep(config_obj.session_reclaim_interval)
+        try:
+            total, exceeded = await session_memory.reclaim(
+                sup_util.sessions, config_obj.session_idle_seconds, budget_bytes
+            )
+        except Exception:
+            # The sweep runs for the bridge's lifetime, one failure must not end it
+            logger.exception("Session memory reclaim failed")
+            continue
+        if exceeded != sup_util.memory_budget_exceeded:
+            logger.warning(
+                "Session memory %d bytes %s the budget, %s new sessions",
+                total,
+                "exceeds" if exceeded else "is back within",
+                "refusing" if exceeded else "accepting",
+            )
+        sup_util.memory_budget_exceeded = exceeded
 
 
 @asynccontextmanager
@@ -66,33 +112,105 @@ async def lifespan(app: FastAPI):  # noqa: ARG001
     sup_util.config_obj = config.load_config(
         pathlib.Path(os.getenv("PRIVATE_ASSISTANT_API_CONFIG_PATH", "local_config.yaml"))
     )
-    sup_util.wakeword_model = openwakeword.Model(
-        wakeword_models=[sup_util.config_obj.path_or_name_wakeword_model],
-        enable_speex_noise_suppression=True,
-        vad_threshold=sup_util.config_obj.vad_threshold,
-        inference_framework=sup_util.config_obj.openwakeword_inference_framework,
+    sup_util.stt_pool = speech_recognition_tools.create_backend_pool(
+        sup_util.config_obj.transcription_backends, sup_util.config_obj
+    )
+    sup_util.tts_pool = speech_recognition_tools.create_backend_pool(
+        sup_util.config_obj.synthesis_backends, sup_util.config_obj
     )
-    sup_util.vad_model = silero_vad.SileroVad(threshold=sup_util.config_obj.vad_threshold, trigger_level=1)
-    async with aiomqtt.Client(
-        hostname=sup_util.config_obj.mqtt_server_host, port=sup_util.config_obj.mqtt_server_port
-    ) as c:
-        # Make client globally available
+    async with (
+        aiomqtt.Client(hostname=sup_util.config_obj.mqtt_server_host, port=sup_util.config_obj.mqtt_server_port) as c,
+        httpx.AsyncClient() as http_client,
+    ):
+        if sup_util.config_obj.tracing_sample_rate > 0:
+            sup_util.span_exporter = tracing.RecentSpanExporter(sup_util.config_obj.tracing_max_spans)
+            tracer_provider = tracing.create_tracer_provider(
+                sup_util.config_obj.tracing_sample_rate, sup_util.span_exporter
+            )
+            sup_util.tracer = tracer_provider.get_tracer(__name__)
+        # Make clients globally available
         sup_util.mqtt_client = c
+        sup_util.http_client = http_client
         # Listen for MQTT messages in (unawaited) asyncio task
         await sup_util.mqtt_client.subscribe(sup_util.config_obj.broadcast_topic, qos=1)
+        if sup_util.config_obj.inference_workers > 0:
+            sup_util.inference_pool = inference_workers.InferenceWorkerPool(
+                sup_util.config_obj.inference_workers,
+                sup_util.config_obj,
+                ring_seconds=sup_util.config_obj.wakeword_gate_preroll_seconds + 2.0,
+            )
+            sup_util.inference_pool.start()
         loop = asyncio.get_event_loop()
-        task = loop.create_task(listen(sup_util.mqtt_client, sup_util=sup_util))
+        tasks = [loop.create_task(listen(sup_util.mqtt_client, sup_util=sup_util))]
+        if sup_util.config_obj.session_reclaim_interval > 0:
+            tasks.append(loop.create_task(reclaim_sessions(sup_util)))
+        if sup_util.config_obj.backend_health_check_interval > 0:
+            tasks.extend(
+                loop.create_task(
+                    pool.run_health_checks(
+                        sup_util.config_obj.backend_health_check_interval, sup_util.config_obj.speech_api_timeout
+                    )
+                )
+                for pool in (sup_util.stt_pool, sup_util.tts_pool)
+                if len(pool.backends) > 1
+            )
         yield
-        # Cancel the task
-        task.cancel()
-        # Wait for the task to be cancelled
-        with suppress(asyncio.CancelledError):
-            await task
+        # Cancel the tasks
+        for task in tasks:
+            task.cancel()
+        # Wait for the tasks to be cancelled
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        if sup_util.inference_pool is not None:
+            await sup_util.inference_pool.close()
+        if sup_util.span_exporter is not None:
+            tracer_provider.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
 
 
+def create_wakeword_gate(
+    config_obj: config.Config, client_conf: client_config.ClientConfig, session_inference: inference.Inference
+) -> wakeword_gate.WakewordGate:
+    return wakeword_gate.WakewordGate(
+        mode=config_obj.wakeword_gate_mode,
+        rms_threshold=config_obj.wakeword_gate_rms_threshold,
+        vad_threshold=config_obj.wakeword_gate_vad_threshold,
+        # The session's VAD, so in worker mode the gate keeps inference off the event loop too
+        vad_probability=session_inference.speech_probability,
+        preroll_samples=int(config_obj.wakeword_gate_preroll_seconds * client_conf.samplerate),
+        hangover_samples=int(config_obj.wakeword_gate_hangover_seconds * client_conf.samplerate),
+        vad_window_samples=silero_vad.CHUNK_SAMPLES,
+    )
+
+
+async def create_session(
+    websocket: WebSocket, client_conf: client_config.ClientConfig, sup_util: support_utils.SupportUtils
+) -> client_session.ClientSession:
+    wakewords = sup_util.config_obj.wakewords_for_room(client_conf.room)
+    session_inference: inference.Inference
+    if sup_util.inference_pool is not None:
+        session_inference = await sup_util.inference_pool.open_session(client_conf.samplerate, wakewords)
+    else:
+        # Model loading takes a while, keep it off the event loop serving the other sessions
+        vad_model = await asyncio.to_thread(sup_util.create_vad_model)
+        wakeword_model = await asyncio.to_thread(sup_util.create_wakeword_model, wakewords)
+        session_inference = inference.LocalInference(wakeword_model, vad_model, wakewords)
+    return client_session.ClientSession(
+        websocket=websocket,
+        client_conf=client_conf,
+        output_queue=asyncio.Queue(),
+        channel=frame_protocol.FrameChannel(room=client_conf.room, version=client_conf.frame_protocol_version),
+        gate=create_wakeword_gate(sup_util.config_obj, client_conf, session_inference),
+        inference=session_inference,
+        wakeword_framer=audio_framer.AudioFramer(inference.OWW_CHUNK_SAMPLES),
+        vad_framer=audio_framer.AudioFramer(silero_vad.CHUNK_SAMPLES),
+        wakeword_detector=inference.WakewordDetector(wakewords),
+    )
+
+
 @app.get("/health")
 async def health() -> dict:
     return {"status": "healthy"}
@@ -101,41 +219,71 @@ async def health() -> dict:
 @app.get("/acceptsConnections")
 async def accepts_connection():
     """Endpoint to check if the app can accept a new WebSocket connection."""
-    if sup_util.websocket_connected:
+    if not sup_util.accepts_sessions:
         return {"status": "busy"}, 503
     return {"status": "ready"}
 
 
+@app.get("/latency")
+async def latency() -> dict:
+    """Latency statistics of the timestamped frame protocol per room."""
+    return {room: dataclasses.asdict(stats) for room, stats in sup_util.latency_stats.items()}
+
+
+@app.get("/sessions")
+async def sessions() -> dict:
+    """Estimated memory per session, as last measured by the reclaim loop."""
+    reports = [session.memory for session in sup_util.sessions if session.memory is not None]
+    return {
+        "total_bytes": sum(report.total_bytes for report in reports),
+        "budget_bytes": int(sup_util.config_obj.session_memory_budget_mb * 1024 * 1024),
+        "budget_exceeded": sup_util.memory_budget_exceeded,
+        "sessions": [dataclasses.asdict(report) | {"total_bytes": report.total_bytes} for report in reports],
+    }
+
+
+@app.get("/traces")
+async def traces() -> dict:
+    """Recently finished command traces, spans grouped by trace id."""
+    if sup_util.span_exporter is None:
+        return {}
+    return sup_util.span_exporter.traces()
+
+
 @app.websocket("/client_control")
 async def websocket_endpoint(websocket: WebSocket):
-    if sup_util.websocket_connected:
+    if not sup_util.accepts_sessions:
         await websocket.close(code=1001, reason="Server busy")
         return
 
-    sup_util.websocket_connected = True  # Mark WebSocket as connected
+    sup_util.reserve_session()  # Mark WebSocket as connected
+    session: client_session.ClientSession | None = None
     await websocket.accept()
     try:
         client_config_raw = await websocket.receive_json()
         client_conf = client_config.ClientConfig.model_validate(client_config_raw)
-        output_queue: asyncio.Queue[messages.Response] = asyncio.Queue()
         output_topic = f"assistant/{client_conf.room}/output"
         client_conf.output_topic = output_topic
-        sup_util.mqtt_subscription_to_queue[output_topic] = output_queue
+        session = await create_session(websocket, client_conf, sup_util)
+        sup_util.sessions.append(session)
+        sup_util.mqtt_subscription_to_queue[output_topic] = session.output_queue
         await sup_util.mqtt_client.subscribe(output_topic, qos=1)
-        sup_util.mqtt_subscription_to_queue[sup_util.config_obj.broadcast_topic] = output_queue
+        if session.channel.enabled:
+            sup_util.latency_stats[client_conf.room] = session.channel.stats
         # AIDEV-NOTE: Optimized WebSocket processing to reduce blocking
         while True:
             # Process multiple tasks concurrently to reduce latency
             try:
                 # Check for output messages without blocking
-                await process_output_queue(websocket, output_queue, sup_util.config_obj, client_conf)
+                await process_output_queue(session, sup_util.config_obj)
 
-                # Receive audio message
-                message = await websocket.receive()
+                if session.channel.probe_due():
+                    await websocket.send_bytes(session.channel.make_probe())
 
-                if "bytes" in message:
-                    audio_bytes: bytes = message["bytes"]
-                    await handle_audio_message(websocket, audio_bytes, client_conf, sup_util)
+                # Receive audio message
+                audio_bytes = await receive_audio(session)
+                if audio_bytes is not None:
+                    await handle_audio_message(session, audio_bytes, sup_util)
 
             except asyncio.QueueEmpty:
                 # No output messages to process, continue with audio
@@ -150,29 +298,50 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.exception("Unexpected error occurred: %s", e)
         await websocket.close(code=1011)
     finally:
-        sup_util.websocket_connected = False  # Reset connection status on disconnect or error
+        if session is not None:
+            await close_session(session, sup_util)
+        sup_util.release_session()  # Reset connection status on disconnect or error
 
 
-async def process_output_queue(
-    websocket: WebSocket, 
-    output_queue: asyncio.Queue[messages.Response], 
-    config_obj: config.Config,
-    client_conf: client_config.ClientConfig,
-):
+async def close_session(session: client_session.ClientSession, sup_util: support_utils.SupportUtils) -> None:
+    if session.playback is not None:
+        session.playback.cancel()
+    for command_trace in session.traces:
+        command_trace.end("session closed")
+    sup_util.sessions.remove(session)
+    await release_subscription(session, sup_util)
+    await session.inference.close()
+
+
+async def release_subscription(session: client_session.ClientSession, sup_util: support_utils.SupportUtils) -> None:
+    output_topic = session.client_conf.output_topic
+    # A newer session for the same room may have taken the topic over already
+    if not output_topic or sup_util.mqtt_subscription_to_queue.get(output_topic) is not session.output_queue:
+        return
+    del sup_util.mqtt_subscription_to_queue[output_topic]
+    try:
+        await sup_util.mqtt_client.unsubscribe(output_topic)
+    except aiomqtt.MqttError as e:
+        logger.warning("Failed to unsubscribe from %s: %s", output_topic, e)
+
+
+async def process_output_queue(session: client_session.ClientSession, config_obj: config.Config):
     # AIDEV-NOTE: Optimized to process all available messages to reduce queue buildup
     processed_count = 0
     max_process_per_cycle = 3  # Limit processing to prevent blocking audio
 
     try:
         while processed_count < max_process_per_cycle:
-            response = output_queue.get_nowait()
-            audio_bytes = await speech_recognition_tools.send_text_to_tts_api(
-                response.text, config_obj, sample_rate=client_conf.samplerate
-            )
-            if response.alert is not None and response.alert.play_before:
-                await websocket.send_text("alert_default")
-            if audio_bytes is not None:
-                await websocket.send_bytes(audio_bytes)
+            if is_streaming(session):
+                break
+            response = session.output_queue.get_nowait()
+            await session_memory.mark_active(session)
+            if config_obj.barge_in:
+                # AIDEV-NOTE: Played in the background so the loop keeps scoring the wakeword during playback
+                session.playback = asyncio.create_task(play_response(session, response, config_obj))
+                session.playback.add_done_callback(log_playback_error)
+            else:
+                await play_response(session, response, config_obj)
             processed_count += 1
 
     except asyncio.QueueEmpty:
@@ -181,32 +350,108 @@ async def process_output_queue(
         # No more messages to process
 
 
+async def play_response(
+    session: client_session.ClientSession, response: messages.Response, config_obj: config.Config
+) -> None:
+    command_trace = tracing.take(session.traces, response)
+    tts_span = command_trace.start_span("tts") if command_trace is not None else trace.INVALID_SPAN
+    try:
+        if response.alert is not None and response.alert.play_before:
+            await session.websocket.send_text("alert_default")
+        # AIDEV-NOTE: Sentences are synthesized concurrently and streamed in order to cut time-to-first-audio
+        async with aclosing(
+            speech_recognition_tools.stream_text_to_tts_api(
+                response.text,
+                config_obj,
+                sample_rate=session.client_conf.samplerate,
+                pool=sup_util.tts_pool,
+                client=sup_util.http_client,
+            )
+        ) as audio_segments:
+            async for audio_bytes in audio_segments:
+                await session.websocket.send_bytes(session.channel.wrap(audio_bytes))
+                tts_span.add_event("segment_sent", {"bytes": len(audio_bytes)})
+                # The satellite buffers the audio, it keeps playing after the last byte is sent
+                duration = len(audio_bytes) / (2 * session.client_conf.samplerate)
+                session.playback_until = max(time.monotonic(), session.playback_until) + duration
+    except asyncio.CancelledError:
+        tts_span.set_attribute("interrupted", True)
+        raise
+    finally:
+        # Ends with the last byte sent, the satellite's playback time is not part of the trace
+        tts_span.end()
+        if command_trace is not None:
+            command_trace.end()
+
+
+def log_playback_error(task: asyncio.Task[None]) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Playback failed: %s", task.exception())
+
+
+def is_streaming(session: client_session.ClientSession) -> bool:
+    return session.playback is not None and not session.playback.done()
+
+
+def is_playing(session: client_session.ClientSession) -> bool:
+    return is_streaming(session) or time.monotonic() < session.playback_until
+
+
+async def stop_playback(session: client_session.ClientSession) -> None:
+    """Cancel the response being synthesized and tell the satellite to drop the audio it buffered."""
+    if session.playback is not None:
+        # Cancelling closes the TTS stream, which cancels the synthesis of the remaining sentences
+        session.playback.cancel()
+        with suppress(asyncio.CancelledError):
+            await session.playback
+        session.playback = None
+    session.playback_until = 0.0
+    await session.websocket.send_text("stop_playback")
+
+
+async def receive_audio(session: client_session.ClientSession) -> bytes | None:
+    """Receive the next websocket message and return its audio, None for anything else."""
+    message = await session.websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if "bytes" not in message:
+        return None
+    return session.channel.unwrap(message["bytes"])
+
+
 async def handle_audio_message(
-    websocket: WebSocket,
+    session: client_session.ClientSession,
     audio_bytes: bytes,
-    client_conf: client_config.ClientConfig,
     sup_util: support_utils.SupportUtils,
 ):
-    audio_data = np.frombuffer(audio_bytes, dtype=np.int16)
-    prediction = sup_util.wakeword_model.predict(
-        audio_data,
-        debounce_time=3.0,
-        threshold={sup_util.config_obj.name_wakeword_model: sup_util.config_obj.wakework_detection_threshold},
-    )
-    wakeword_prediction = prediction[sup_util.config_obj.name_wakeword_model]
-    logger.debug(
-        "Wakeword probability: %s, Threshold check: %s",
-        wakeword_prediction,
-        wakeword_prediction >= sup_util.config_obj.wakework_detection_threshold,
-    )
-
-    if wakeword_prediction >= sup_util.config_obj.wakework_detection_threshold:
-        logger.info("Wakeword detected, sending start listening signal.")
-        await websocket.send_text("start_listening")
+    windows = session.wakeword_framer.push(np.frombuffer(audio_bytes, dtype=np.int16))
+    if windows is None:
+        # Less than one model window buffered so far
+        return
+    audio_data = await session.gate.process(windows)
+    if audio_data is None:
+        # Silent room, the frame waits in the gate's pre-roll instead of being scored
+        return
+    prediction = await session.inference.wakeword_scores(audio_data)
+    barge_in = sup_util.config_obj.barge_in and is_playing(session)
+    detected = session.wakeword_detector.detect(prediction, audio_data.size, during_playback=barge_in)
+    logger.debug("Wakeword probabilities: %s, detected: %s", prediction, detected)
+
+    if detected:
+        command_trace = tracing.CommandTrace(sup_util.tracer, session.client_conf.room, detected)
+        if barge_in:
+            logger.info("Wakeword %s detected during playback, stopping playback.", ", ".join(detected))
+            await stop_playback(session)
+        logger.info("Wakeword %s detected, sending start listening signal.", ", ".join(detected))
+        await session_memory.mark_active(session)
+        await session.websocket.send_text("start_listening")
         await processing_sound.processing_spoken_commands(
-            websocket=websocket,
+            session=session,
             sup_util=sup_util,
             config_obj=sup_util.config_obj,
-            client_conf=client_conf,
             logger=logger,
+            command_trace=command_trace,
         )
+        # The pre-roll and any partial window predate the command, they must not reach the model
+        session.gate.reset()
+        session.wakeword_framer.reset()
@@ -0,0 +1,48 @@
+import numpy as np
+import numpy.typing as np_typing
+
+
+class AudioFramer:
+    """Re-chunks audio of arbitrary frame sizes into exact multiples of a model's window.
+
+    The transport may split or merge frames freely; every call returns all complete windows
+    received so far as one contiguous block and keeps the incomplete tail in a buffer that is
+    allocated once. When nothing is pending the block is a view of the input, so clients that
+    send window-aligned frames cost no copy at all.
+    """
+
+    def __init__(self, window_samples: int) -> None:
+        if window_samples <= 0:
+            raise ValueError("Window size must be positive")
+        self.window_samples = window_samples
+        self._pending: np_typing.NDArray[np.int16] = np.empty(window_samples, dtype=np.int16)
+        self._pending_size = 0
+
+    @property
+    def pending_samples(self) -> int:
+        return self._pending_size
+
+    def push(self, audio: np_typing.NDArray[np.int16]) -> np_typing.NDArray[np.int16] | None:
+        """Add audio and return the complete windows now available, or None if there are none."""
+        window = self.window_samples
+        head: np_typing.NDArray[np.int16] | None = None
+        if self._pending_size:
+            missing = window - self._pending_size
+            if audio.size < missing:
+                self._pending[self._pending_size : self._pending_size + audio.size] = audio
+                self._pending_size += audio.size
+                return None
+            self._pending[self._pending_size :] = audio[:missing]
+            # Copied out, the pending buffer is reused for the next tail
+            head = self._pending.copy()
+            audio = audio[missing:]
+        n_aligned = audio.size - audio.size % window
+        tail = audio[n_aligned:]
+        self._pending[: tail.size] = tail
+        self._pending_size = tail.size
+        if head is None:
+            return audio[:n_aligned] if n_aligned else None
+        return np.concatenate((head, audio[:n_aligned])) if n_aligned else head
+
+    def reset(self) -> None:
+        self._pending_size = 0
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import TypeVar
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EWMA_GAIN = 0.2
+MIN_HEDGE_SAMPLES = 10
+
+
+class RoutingStrategy(StrEnum):
+    LEAST_OUTSTANDING = "least_outstanding"
+    LEAST_LATENCY = "least_latency"
+
+
+@dataclass
+class Backend:
+    url: str
+    outstanding: int = 0
+    latency_ewma: float | None = None
+    consecutive_failures: int = 0
+    circuit_open_until: float = 0.0
+    healthy: bool = True
+
+    def circuit_closed(self, now: float, failure_threshold: int) -> bool:
+        if failure_threshold <= 0 or self.consecutive_failures < failure_threshold:
+            return True
+        # Half-open: after the reset period a single trial request is let through
+        return now >= self.circuit_open_until and self.outstanding == 0
+
+
+@dataclass
+class BackendPool:
+    """Routes requests for one service (STT or TTS) across several equivalent backends.
+
+    Each request goes to the backend with the fewest outstanding requests or the lowest
+    recent latency. Backends that fail repeatedly are skipped for a while (circuit
+    breaking) and failed requests fail over to the next backend. With hedging enabled a
+    second backend is raised when the first has not answered within the pool's p95 latency.
+    """
+
+    urls: list[str]
+    routing: RoutingStrategy = RoutingStrategy.LEAST_OUTSTANDING
+    hedging: bool = False
+    hedge_percentile: float = 95.0
+    hedge_min_delay: float = 0.05
+    failure_threshold: int = 3
+    circuit_reset_seconds: float = 30.0
+    latency_window: int = 200
+    backends: list[Backend] = field(init=False)
+    _latencies: deque[float] = field(init=False)
+
+    def __post_init__(self) -> None:
+        if not self.urls:
+            raise ValueError("Backend pool needs at least one URL")
+        self.backends = [Backend(url=url) for url in self.urls]
+        self._latencies = deque(maxlen=self.latency_window)
+
+    def select(self, exclude: set[str] | None = None) -> Backend | None:
+        exclude = exclude or set()
+        now = time.monotonic()
+        remaining = [b for b in self.backends if b.url not in exclude]
+        candidates = [b for b in remaining if b.healthy and b.circuit_closed(now, self.failure_threshold)]
+        # AIDEV-NOTE: When every backend looks broken keep trying them rather than failing fast,
+        # a single-backend deployment must behave as before.
+        candidates = candidates or remaining
+        if not candidates:
+            return None
+        if self.routing == RoutingStrategy.LEAST_LATENCY:
+            # Backends without measurements sort first so they get explored
+            return min(candidates, key=lambda b: (b.latency_ewma or 0.0, b.outstanding))
+        return min(candidates, key=lambda b: (b.outstanding, b.latency_ewma or 0.0))
+
+    def hedge_delay(self) -> float | None:
+        if not self.hedging or len(self._latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        return max(self.hedge_min_delay, float(np.percentile(self._latencies, self.hedge_percentile)))
+
+    async def request(self, send: Callable[[str], Awaitable[T | None]]) -> T | None:
+        """Call ``send`` with a backend URL and return the first successful (non-None) result."""
+        tried: set[str] = set()
+        attempts: dict[asyncio.Task[T | None], Backend] = {}
+        hedged = False
+
+        def launch() -> bool:
+            backend = self.select(exclude=tried)
+            if backend is None:
+                return False
+            tried.add(backend.url)
+            # Counted before the task runs so concurrent requests see it when selecting
+            backend.outstanding += 1
+            task = asyncio.create_task(self._attempt(backend, send))
+            task.add_done_callback(lambda _: self._release(backend))
+            attempts[task] = backend
+            return True
+
+        launch()
+        try:
+            while attempts:
+                delay = None if hedged else self.hedge_delay()
+                done, _ = await asyncio.wait(attempts, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    if launch():
+                        logger.debug("Hedging request after %.3f seconds", delay)
+                    continue
+                for task in done:
+                    backend = attempts.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        return result
+                    logger.warning("Backend %s failed", backend.url)
+                if not attempts:
+                    launch()
+            logger.error("All backends failed")
+            return None
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    async def _attempt(self, backend: Backend, send: Callable[[str], Awaitable[T | None]]) -> T | None:
+        start = time.monotonic()
+        result = await send(backend.url)
+        elapsed = time.monotonic() - start
+        if result is None:
+            self._record_failure(backend)
+        else:
+            self._record_success(backend, elapsed)
+        return result
+
+    @staticmethod
+    def _release(backend: Backend) -> None:
+        backend.outstanding -= 1
+
+    def _record_success(self, backend: Backend, elapsed: float) -> None:
+        backend.consecutive_failures = 0
+        if backend.latency_ewma is None:
+            backend.latency_ewma = elapsed
+        else:
+            backend.latency_ewma += (elapsed - backend.latency_ewma) * EWMA_GAIN
+        self._latencies.append(elapsed)
+
+    def _record_failure(self, backend: Backend) -> None:
+        backend.consecutive_failures += 1
+        if self.failure_threshold > 0 and backend.consecutive_failures >= self.failure_threshold:
+            backend.circuit_open_until = time.monotonic() + self.circuit_reset_seconds
+            logger.warning("Circuit opened for backend %s", backend.url)
+
+    async def check_health(self, client: httpx.AsyncClient, timeout: float) -> None:
+        """Probe every backend; any HTTP answer below 500 counts as reachable."""
+
+        async def probe(backend: Backend) -> None:
+            try:
+                response = await client.get(backend.url, timeout=timeout)
+                healthy = response.status_code < httpx.codes.INTERNAL_SERVER_ERROR
+            except httpx.HTTPError:
+                healthy = False
+            if healthy != backend.healthy:
+                logger.warning("Backend %s is now %s", backend.url, "healthy" if healthy else "unhealthy")
+            backend.healthy = healthy
+
+        await asyncio.gather(*(probe(backend) for backend in self.backends))
+
+    async def run_health_checks(self, interval: float, timeout: float) -> None:
+        async with httpx.AsyncClient() as client:
+            while True:
+                await self.check_health(client, timeout)
+                await asyncio.sleep(interval)
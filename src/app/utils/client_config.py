@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.utils import frame_protocol
 
 
 class ClientConfig(BaseModel):
@@ -8,3 +10,8 @@ class ClientConfig(BaseModel):
     chunk_size: int
     room: str
     output_topic: str = ""
+    frame_protocol_version: int = Field(
+        default=frame_protocol.LEGACY_PROTOCOL_VERSION,
+        ge=frame_protocol.LEGACY_PROTOCOL_VERSION,
+        le=frame_protocol.PROTOCOL_VERSION,
+    )
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from fastapi import WebSocket
+    from private_assistant_commons import messages
+
+    from app.utils import (
+        audio_framer,
+        client_config,
+        frame_protocol,
+        inference,
+        session_memory,
+        tracing,
+        wakeword_gate,
+    )
+
+
+@dataclass
+class ClientSession:
+    """State owned by one connected satellite.
+
+    The wakeword and VAD models keep streaming buffers between frames, so every session
+    needs its own instances once the bridge serves more than one satellite. Inference runs
+    either locally or in a worker process, the wakeword gate's VAD included.
+    """
+
+    websocket: WebSocket
+    client_conf: client_config.ClientConfig
+    output_queue: asyncio.Queue[messages.Response]
+    channel: frame_protocol.FrameChannel
+    gate: wakeword_gate.WakewordGate
+    # Wakewords enabled in this room, all scored by one model in a single pass; declared before
+    # the inference field, which shadows the module name in the class body
+    wakeword_detector: inference.WakewordDetector
+    inference: inference.Inference
+    # Exact model windows regardless of how the client sizes its websocket frames
+    wakeword_framer: audio_framer.AudioFramer
+    vad_framer: audio_framer.AudioFramer
+    last_activity: float = field(default_factory=time.monotonic)
+    memory: session_memory.SessionMemory | None = None
+    # Background TTS playback when barge-in is enabled, and when the satellite's buffered audio ends
+    playback: asyncio.Task[None] | None = None
+    playback_until: float = 0.0
+    # Commands published and waiting for, or playing, their reply
+    traces: deque[tracing.CommandTrace] = field(default_factory=deque)
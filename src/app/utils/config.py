@@ -3,21 +3,69 @@ import socket
 from pathlib import Path
 
 import yaml
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, ValidationError, model_validator
+
+from app.utils.backend_pool import RoutingStrategy
+from app.utils.wakeword_gate import GateMode
 
 logger = logging.getLogger(__name__)
 
 
+class WakewordModel(BaseModel):
+    # Key of the model's score in openwakeword's predictions, the file name without extension
+    name: str
+    path_or_name: str
+    threshold: float = 0.5
+    # Used instead of threshold while the bridge's own speech is playing, None keeps threshold
+    barge_in_threshold: float | None = None
+
+
 class Config(BaseModel):
     wakework_detection_threshold: float = 0.5
     openwakeword_inference_framework: str = "onnx"
     path_or_name_wakeword_model: str = "/app/assets/hey_nova.onnx"
     name_wakeword_model: str = "hey_nova"
+    # AIDEV-NOTE: When set, replaces the single wakeword above; room_wakewords limits rooms to a subset by name
+    wakewords: list[WakewordModel] = []
+    room_wakewords: dict[str, list[str]] = {}
+    # AIDEV-NOTE: Pre-gate that skips wakeword scoring while a room is silent
+    wakeword_gate_mode: GateMode = GateMode.OFF
+    wakeword_gate_rms_threshold: float = 100.0
+    wakeword_gate_vad_threshold: float = 0.3
+    wakeword_gate_preroll_seconds: float = 2.0
+    wakeword_gate_hangover_seconds: float = 2.0
     speech_transcription_api: str = "http://localhost:8000/transcribe"
     speech_transcription_api_token: str | None = None
     speech_synthesis_api: str = "http://localhost:8080/synthesizeSpeech"
     speech_synthesis_api_token: str | None = None
+    # AIDEV-NOTE: Optional lists of equivalent backends; when empty the single URL above is used
+    speech_transcription_apis: list[str] = []
+    speech_synthesis_apis: list[str] = []
+    speech_api_timeout: float = 10.0
+    backend_routing: RoutingStrategy = RoutingStrategy.LEAST_OUTSTANDING
+    backend_hedging: bool = False
+    backend_hedge_percentile: float = 95.0
+    backend_hedge_min_delay: float = 0.05
+    backend_failure_threshold: int = 3
+    backend_circuit_reset_seconds: float = 30.0
+    backend_health_check_interval: float = 10.0
+    tts_split_sentences: bool = True
+    tts_max_parallel_segments: int = 2
+    tts_min_segment_chars: int = 20
+    # AIDEV-NOTE: With barge-in, wakewords are scored during playback and a detection cancels the answer
+    barge_in: bool = False
+    barge_in_threshold: float | None = None
     client_id: str = socket.gethostname()
+    max_sessions: int = 1
+    # AIDEV-NOTE: 0 runs inference on the event loop, >0 shards sessions across worker processes
+    inference_workers: int = 0
+    # AIDEV-NOTE: Idle sessions shrink their model buffers; 0 disables idle hibernation or the budget
+    session_idle_seconds: float = 300.0
+    session_memory_budget_mb: float = 0.0
+    session_reclaim_interval: float = 10.0
+    # AIDEV-NOTE: Share of commands traced from wakeword to reply, 0 disables tracing
+    tracing_sample_rate: float = 0.0
+    tracing_max_spans: int = 1000
     max_command_input_seconds: int = 30
     max_length_speech_pause: float = 0.5
     vad_threshold: float = 0.6
@@ -28,6 +76,49 @@ class Config(BaseModel):
     input_topic_overwrite: str | None = None
     output_topic_overwrite: str | None = None
 
+    @model_validator(mode="after")
+    def check_room_wakewords(self) -> "Config":
+        known = {wakeword.name for wakeword in self.wakeword_models}
+        for room, names in self.room_wakewords.items():
+            if not names:
+                # openwakeword would load every pretrained model for an empty list
+                raise ValueError(f"Room {room} needs at least one wakeword")
+            unknown = set(names) - known
+            if unknown:
+                raise ValueError(f"Room {room} uses unknown wakewords: {sorted(unknown)}")
+        return self
+
+    @property
+    def wakeword_models(self) -> list[WakewordModel]:
+        wakewords = self.wakewords or [
+            WakewordModel(
+                name=self.name_wakeword_model,
+                path_or_name=self.path_or_name_wakeword_model,
+                threshold=self.wakework_detection_threshold,
+            )
+        ]
+        # The global barge-in threshold applies to every wakeword without its own
+        return [
+            wakeword
+            if wakeword.barge_in_threshold is not None
+            else wakeword.model_copy(update={"barge_in_threshold": self.barge_in_threshold})
+            for wakeword in wakewords
+        ]
+
+    def wakewords_for_room(self, room: str) -> list[WakewordModel]:
+        names = self.room_wakewords.get(room)
+        if names is None:
+            return self.wakeword_models
+        return [wakeword for wakeword in self.wakeword_models if wakeword.name in names]
+
+    @property
+    def transcription_backends(self) -> list[str]:
+        return self.speech_transcription_apis or [self.speech_transcription_api]
+
+    @property
+    def synthesis_backends(self) -> list[str]:
+        return self.speech_synthesis_apis or [self.speech_synthesis_api]
+
     @property
     def base_topic(self) -> str:
         return self.base_topic_overwrite or f"assistant/comms_bridge/all/{self.client_id}"
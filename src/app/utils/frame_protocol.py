@@ -0,0 +1,201 @@
+import logging
+import struct
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+
+logger = logging.getLogger(__name__)
+
+# AIDEV-NOTE: Version 0 is the legacy protocol (raw PCM bytes, no header). Clients opt into
+# timestamped framing by sending a higher frame_protocol_version in their ClientConfig.
+LEGACY_PROTOCOL_VERSION = 0
+PROTOCOL_VERSION = 1
+
+# version, frame type, sequence number, sender monotonic timestamp in microseconds
+HEADER = struct.Struct("<BBIq")
+# Payload of a CLOCK_REPLY: echoed probe send time, client receive time
+CLOCK_REPLY_PAYLOAD = struct.Struct("<qq")
+
+SEQUENCE_MODULO = 2**32
+JITTER_GAIN = 1 / 16  # RFC 3550 interarrival jitter smoothing
+
+
+class FrameType(IntEnum):
+    AUDIO = 1
+    CLOCK_PROBE = 2
+    CLOCK_REPLY = 3
+    PLAYBACK_STARTED = 4
+
+
+@dataclass
+class Frame:
+    frame_type: FrameType
+    sequence: int
+    timestamp_us: int
+    payload: bytes = b""
+
+
+def monotonic_us() -> int:
+    return time.monotonic_ns() // 1000
+
+
+def encode_frame(frame_type: FrameType, sequence: int, timestamp_us: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(PROTOCOL_VERSION, frame_type, sequence % SEQUENCE_MODULO, timestamp_us) + payload
+
+
+def decode_frame(data: bytes) -> Frame:
+    if len(data) < HEADER.size:
+        raise ValueError(f"Frame must be at least {HEADER.size} bytes, got {len(data)}")
+    version, frame_type, sequence, timestamp_us = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame protocol version: {version}")
+    return Frame(FrameType(frame_type), sequence, timestamp_us, data[HEADER.size :])
+
+
+@dataclass
+class LatencyStats:
+    room: str
+    frames_received: int = 0
+    frames_lost: int = 0
+    clock_offset_us: int | None = None
+    round_trip_us: int | None = None
+    transport_delay_us: int | None = None
+    jitter_us: float = 0.0
+    time_to_first_audio_us: int | None = None
+
+
+class FrameChannel:
+    """Per-session framing and latency bookkeeping.
+
+    With the legacy protocol every binary message is passed through untouched. With the
+    timestamped protocol audio is unwrapped from its header and the sequence numbers and
+    timestamps are used to estimate clock offset, transport delay, jitter and the time from
+    the end of a spoken command to the satellite starting playback of the reply.
+    """
+
+    def __init__(
+        self,
+        room: str,
+        version: int = LEGACY_PROTOCOL_VERSION,
+        probe_interval_us: int = 5_000_000,
+        clock_sample_window: int = 8,
+    ) -> None:
+        self.version = version
+        self.stats = LatencyStats(room=room)
+        self.probe_interval_us = probe_interval_us
+        self._clock_samples: deque[tuple[int, int]] = deque(maxlen=clock_sample_window)
+        self._pending_probes: dict[int, int] = {}
+        self._probe_sequence = 0
+        self._last_probe_us: int | None = None
+        self._output_sequence = 0
+        self._expected_sequence: int | None = None
+        self._last_transit_us: int | None = None
+        self._command_end_us: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.version >= PROTOCOL_VERSION
+
+    def unwrap(self, data: bytes, receive_us: int | None = None) -> bytes | None:
+        """Return the audio payload of a binary message, or None if it was a control frame."""
+        if not self.enabled:
+            return data
+        receive_us = monotonic_us() if receive_us is None else receive_us
+        try:
+            frame = decode_frame(data)
+        except ValueError as e:
+            logger.warning("Discarding malformed frame: %s", e)
+            return None
+        if frame.frame_type == FrameType.AUDIO:
+            self._on_audio(frame, receive_us)
+            return frame.payload
+        if frame.frame_type == FrameType.CLOCK_REPLY:
+            self._on_clock_reply(frame, receive_us)
+        elif frame.frame_type == FrameType.PLAYBACK_STARTED:
+            self._on_playback_started(frame)
+        else:
+            logger.warning("Unexpected frame type from client: %s", frame.frame_type.name)
+        return None
+
+    def wrap(self, audio: bytes) -> bytes:
+        """Frame outgoing audio; a no-op for the legacy protocol."""
+        if not self.enabled:
+            return audio
+        self._output_sequence = (self._output_sequence + 1) % SEQUENCE_MODULO
+        return encode_frame(FrameType.AUDIO, self._output_sequence, monotonic_us(), audio)
+
+    def probe_due(self, now_us: int | None = None) -> bool:
+        if not self.enabled:
+            return False
+        now_us = monotonic_us() if now_us is None else now_us
+        return self._last_probe_us is None or now_us - self._last_probe_us >= self.probe_interval_us
+
+    def make_probe(self, now_us: int | None = None) -> bytes:
+        now_us = monotonic_us() if now_us is None else now_us
+        self._probe_sequence = (self._probe_sequence + 1) % SEQUENCE_MODULO
+        self._last_probe_us = now_us
+        # Replies that never arrive must not pile up
+        self._pending_probes = {
+            seq: t for seq, t in self._pending_probes.items() if now_us - t < self.probe_interval_us
+        }
+        self._pending_probes[self._probe_sequence] = now_us
+        return encode_frame(FrameType.CLOCK_PROBE, self._probe_sequence, now_us)
+
+    def mark_command_end(self, now_us: int | None = None) -> None:
+        """Remember when the bridge stopped listening, the reference for time-to-first-audio."""
+        self._command_end_us = monotonic_us() if now_us is None else now_us
+
+    def _to_bridge_clock(self, client_us: int) -> int | None:
+        if self.stats.clock_offset_us is None:
+            return None
+        return client_us - self.stats.clock_offset_us
+
+    def _on_audio(self, frame: Frame, receive_us: int) -> None:
+        stats = self.stats
+        stats.frames_received += 1
+        if self._expected_sequence is not None and frame.sequence != self._expected_sequence:
+            gap = (frame.sequence - self._expected_sequence) % SEQUENCE_MODULO
+            # Large gaps are reordering or a client restart rather than loss
+            if gap < SEQUENCE_MODULO // 2:
+                stats.frames_lost += gap
+        self._expected_sequence = (frame.sequence + 1) % SEQUENCE_MODULO
+
+        transit_us = receive_us - frame.timestamp_us
+        if self._last_transit_us is not None:
+            deviation = abs(transit_us - self._last_transit_us)
+            stats.jitter_us += (deviation - stats.jitter_us) * JITTER_GAIN
+        self._last_transit_us = transit_us
+
+        sent_us = self._to_bridge_clock(frame.timestamp_us)
+        if sent_us is not None:
+            stats.transport_delay_us = receive_us - sent_us
+
+    def _on_clock_reply(self, frame: Frame, receive_us: int) -> None:
+        probe_sent_us = self._pending_probes.pop(frame.sequence, None)
+        if probe_sent_us is None or len(frame.payload) < CLOCK_REPLY_PAYLOAD.size:
+            logger.debug("Ignoring unmatched clock reply %d", frame.sequence)
+            return
+        _, client_receive_us = CLOCK_REPLY_PAYLOAD.unpack_from(frame.payload)
+        client_send_us = frame.timestamp_us
+        round_trip_us = (receive_us - probe_sent_us) - (client_send_us - client_receive_us)
+        offset_us = ((client_receive_us - probe_sent_us) + (client_send_us - receive_us)) // 2
+        self._clock_samples.append((round_trip_us, offset_us))
+        # The sample with the smallest round trip has the least asymmetric queuing delay
+        best_round_trip_us, best_offset_us = min(self._clock_samples)
+        self.stats.round_trip_us = best_round_trip_us
+        self.stats.clock_offset_us = best_offset_us
+
+    def _on_playback_started(self, frame: Frame) -> None:
+        started_us = self._to_bridge_clock(frame.timestamp_us)
+        if started_us is None or self._command_end_us is None:
+            return
+        self.stats.time_to_first_audio_us = started_us - self._command_end_us
+        self._command_end_us = None
+        logger.info(
+            "Room %s: time to first audio %.1f ms (transport %.1f ms, jitter %.1f ms)",
+            self.stats.room,
+            self.stats.time_to_first_audio_us / 1000,
+            (self.stats.transport_delay_us or 0) / 1000,
+            self.stats.jitter_us / 1000,
+        )
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import sys
+from collections import deque
+from typing import TYPE_CHECKING, Protocol
+
+if TYPE_CHECKING:
+    import numpy as np
+    import numpy.typing as np_typing
+    import openwakeword
+
+    from app.utils import config, silero_vad
+
+
+class Inference(Protocol):
+    """Model inference for one session, either in-process or in a worker process."""
+
+    async def wakeword_scores(self, audio: np_typing.NDArray[np.int16]) -> dict[str, float]: ...
+
+    async def speech_probability(self, audio_bytes: bytes) -> float: ...
+
+    @property
+    def hibernated(self) -> bool:
+        """Whether the wakeword buffers are cut down; scoring a long batch wakes them on its own."""
+        ...
+
+    async def hibernate(self) -> int: ...
+
+    async def wake(self) -> int: ...
+
+    async def memory_bytes(self) -> int: ...
+
+    async def close(self) -> None: ...
+
+
+def predict_wakeword(
+    wakeword_model: openwakeword.Model, audio: np_typing.NDArray[np.int16], wakewords: list[config.WakewordModel]
+) -> dict[str, float]:
+    # openwakeword's own debounce is left off, WakewordDetector debounces only actual detections
+    prediction = wakeword_model.predict(audio)
+    return {wakeword.name: float(prediction[wakeword.name]) for wakeword in wakewords}
+
+
+def detected_wakewords(
+    scores: dict[str, float], wakewords: list[config.WakewordModel], during_playback: bool = False
+) -> list[str]:
+    detected = []
+    for wakeword in wakewords:
+        threshold = wakeword.threshold
+        if during_playback and wakeword.barge_in_threshold is not None:
+            # Echo of the bridge's own speech reaches the microphone, a stricter threshold tolerates it
+            threshold = wakeword.barge_in_threshold
+        if scores.get(wakeword.name, 0.0) >= threshold:
+            detected.append(wakeword.name)
+    return detected
+
+
+# Detections of the same wakeword within this much scored audio are one utterance
+DEBOUNCE_SAMPLES = 3 * 16000
+
+
+class WakewordDetector:
+    """Applies a session's thresholds to wakeword scores and debounces the detections.
+
+    openwakeword can debounce by itself, but it suppresses a score after any recent score at
+    or above the normal threshold. During playback the echo of the bridge's own speech often
+    scores there without reaching the barge-in threshold, and would then hide a real wakeword
+    spoken over the reply. Here only detections start the debounce window, which is counted in
+    scored audio so that the time spent capturing a command does not shorten it.
+    """
+
+    def __init__(self, wakewords: list[config.WakewordModel], debounce_samples: int = DEBOUNCE_SAMPLES) -> None:
+        self.wakewords = wakewords
+        self.debounce_samples = debounce_samples
+        # Audio scored since each wakeword was last detected
+        self._since_detection: dict[str, int] = {}
+
+    def detect(self, scores: dict[str, float], n_samples: int, during_playback: bool = False) -> list[str]:
+        for name in self._since_detection:
+            self._since_detection[name] += n_samples
+        detected = []
+        for name in detected_wakewords(scores, self.wakewords, during_playback):
+            if self._since_detection.get(name, self.debounce_samples) < self.debounce_samples:
+                continue
+            self._since_detection[name] = 0
+            detected.append(name)
+        return detected
+
+
+# openwakeword streams in 80 ms chunks; each chunk adds 8 melspectrogram frames and one embedding
+# computed from the last 76 melspectrogram frames, with 480 extra samples of window overlap.
+OWW_CHUNK_SAMPLES = 1280
+OWW_MEL_FRAMES_PER_CHUNK = 8
+OWW_EMBEDDING_MEL_FRAMES = 76
+OWW_WINDOW_OVERLAP_SAMPLES = 480
+# Largest batch a hibernated model still scores without restoring its full buffers
+HIBERNATED_MAX_CHUNKS = 4
+# Every sample in openwakeword's raw buffer is a Python int object plus the deque's pointer to it
+PY_INT_BYTES = sys.getsizeof(2**15) + 8
+
+
+class WakewordRunner:
+    """A session's wakeword model together with the streaming buffers openwakeword keeps.
+
+    By default openwakeword holds 10 seconds of raw audio as a deque of Python ints, plus
+    10 seconds of melspectrogram and feature history, which is several megabytes per
+    session. Scoring only reads the tail of these buffers, so an idle session can hibernate:
+    the buffers are cut to what a small batch needs and capped there until the session wakes.
+    """
+
+    def __init__(self, wakeword_model: openwakeword.Model, wakewords: list[config.WakewordModel]) -> None:
+        self.model = wakeword_model
+        self.wakewords = wakewords
+        self.hibernated = False
+        self._full_limits: tuple[int | None, int, int] | None = None
+
+    def scores(self, audio: np_typing.NDArray[np.int16]) -> dict[str, float]:
+        if self.hibernated and audio.size > (HIBERNATED_MAX_CHUNKS - 1) * OWW_CHUNK_SAMPLES:
+            # A pre-roll replay needs more context than the hibernated buffers hold
+            self.wake()
+        return predict_wakeword(self.model, audio, self.wakewords)
+
+    def hibernate(self) -> int:
+        if not self.hibernated:
+            preprocessor = self.model.preprocessor
+            self._full_limits = (
+                preprocessor.raw_data_buffer.maxlen,
+                preprocessor.melspectrogram_max_len,
+                preprocessor.feature_buffer_max_len,
+            )
+            raw_samples = HIBERNATED_MAX_CHUNKS * OWW_CHUNK_SAMPLES + OWW_WINDOW_OVERLAP_SAMPLES
+            mel_frames = OWW_EMBEDDING_MEL_FRAMES + OWW_MEL_FRAMES_PER_CHUNK * (HIBERNATED_MAX_CHUNKS - 1)
+            feature_frames = max(self.model.model_inputs.values(), default=16) + HIBERNATED_MAX_CHUNKS - 1
+            # Copies, so the memory of the full buffers is actually released
+            preprocessor.raw_data_buffer = deque(preprocessor.raw_data_buffer, maxlen=raw_samples)
+            preprocessor.melspectrogram_buffer = preprocessor.melspectrogram_buffer[-mel_frames:].copy()
+            preprocessor.melspectrogram_max_len = mel_frames
+            preprocessor.feature_buffer = preprocessor.feature_buffer[-feature_frames:].copy()
+            preprocessor.feature_buffer_max_len = feature_frames
+            self.hibernated = True
+        return self.memory_bytes()
+
+    def wake(self) -> int:
+        if self.hibernated and self._full_limits is not None:
+            preprocessor = self.model.preprocessor
+            raw_samples, preprocessor.melspectrogram_max_len, preprocessor.feature_buffer_max_len = self._full_limits
+            preprocessor.raw_data_buffer = deque(preprocessor.raw_data_buffer, maxlen=raw_samples)
+            self.hibernated = False
+        return self.memory_bytes()
+
+    def memory_bytes(self) -> int:
+        """Estimated size of the session's streaming buffers; model weights are not included."""
+        preprocessor = self.model.preprocessor
+        raw = preprocessor.raw_data_buffer
+        return int(
+            sys.getsizeof(raw)
+            + len(raw) * PY_INT_BYTES
+            + preprocessor.melspectrogram_buffer.nbytes
+            + preprocessor.feature_buffer.nbytes
+            + preprocessor.raw_data_remainder.nbytes
+            + sum(len(scores) * PY_INT_BYTES for scores in self.model.prediction_buffer.values())
+        )
+
+
+class LocalInference:
+    """Runs the session's models directly on the event loop thread."""
+
+    def __init__(
+        self,
+        wakeword_model: openwakeword.Model,
+        vad_model: silero_vad.SileroVad,
+        wakewords: list[config.WakewordModel],
+    ) -> None:
+        self.wakeword = WakewordRunner(wakeword_model, wakewords)
+        self.vad_model = vad_model
+
+    async def wakeword_scores(self, audio: np_typing.NDArray[np.int16]) -> dict[str, float]:
+        return self.wakeword.scores(audio)
+
+    async def speech_probability(self, audio_bytes: bytes) -> float:
+        return self.vad_model.probability(audio_bytes)
+
+    @property
+    def hibernated(self) -> bool:
+        return self.wakeword.hibernated
+
+    async def hibernate(self) -> int:
+        return self.wakeword.hibernate()
+
+    async def wake(self) -> int:
+        return self.wakeword.wake()
+
+    async def memory_bytes(self) -> int:
+        return self.wakeword.memory_bytes()
+
+    async def close(self) -> None:
+        return None
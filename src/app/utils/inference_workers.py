@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import struct
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.utils import inference, shared_ring, silero_vad
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+    import numpy.typing as np_typing
+
+    from app.utils import config, support_utils
+
+logger = logging.getLogger(__name__)
+
+# op code, slot id, sample count; OPEN carries the ring and wakeword names after the header
+REQUEST = struct.Struct("<BII")
+# op code, slot id, number of results (0 on error), whether the slot's wakeword model is
+# hibernated afterwards, memory estimate in bytes. Scores are written to the slot's float32
+# score ring; a memory op's single result is the integer in the header.
+REPLY = struct.Struct("<BII?Q")
+
+
+class Op(IntEnum):
+    OPEN = 1
+    CLOSE = 2
+    WAKEWORD = 3
+    VAD = 4
+    # Reply with the slot's memory estimate in bytes, after hibernating or waking it
+    HIBERNATE = 5
+    WAKE = 6
+    MEMORY = 7
+
+
+MEMORY_OPS = (Op.HIBERNATE, Op.WAKE, Op.MEMORY)
+
+
+@dataclass
+class Reply:
+    n_results: int
+    hibernated: bool
+    memory_bytes: int
+
+
+class _WorkerSlot:
+    """Models and rings of one session inside a worker process."""
+
+    def __init__(
+        self,
+        audio_ring: shared_ring.SharedRing,
+        score_ring: shared_ring.SharedRing,
+        wakewords: list[config.WakewordModel],
+    ) -> None:
+        self.audio_ring = audio_ring
+        self.score_ring = score_ring
+        self.wakewords = wakewords
+        self._wakeword: inference.WakewordRunner | None = None
+        self._vad_model: silero_vad.SileroVad | None = None
+        # Requested before the wakeword model was loaded, applied once it is
+        self._hibernated = False
+
+    @property
+    def hibernated(self) -> bool:
+        return self._wakeword.hibernated if self._wakeword is not None else self._hibernated
+
+    def wakeword(self, factory: support_utils.SupportUtils) -> inference.WakewordRunner:
+        if self._wakeword is None:
+            self._wakeword = inference.WakewordRunner(factory.create_wakeword_model(self.wakewords), self.wakewords)
+            if self._hibernated:
+                self._wakeword.hibernate()
+        return self._wakeword
+
+    def memory_op(self, op: Op) -> int:
+        if self._wakeword is None:
+            # Models are loaded on first use, a slot that never scored holds no buffers yet
+            if op in (Op.HIBERNATE, Op.WAKE):
+                self._hibernated = op == Op.HIBERNATE
+            return 0
+        if op == Op.HIBERNATE:
+            return self._wakeword.hibernate()
+        if op == Op.WAKE:
+            return self._wakeword.wake()
+        return self._wakeword.memory_bytes()
+
+    def vad_model(self, factory: support_utils.SupportUtils) -> silero_vad.SileroVad:
+        if self._vad_model is None:
+            self._vad_model = factory.create_vad_model()
+        return self._vad_model
+
+    def close(self) -> None:
+        self.audio_ring.close()
+        self.score_ring.close()
+
+
+def worker_main(conn: Connection, config_obj: config.Config) -> None:
+    """Entry point of a worker process: serve requests until the pipe closes."""
+    # Imported here so the spawned interpreter only pays for what the worker needs
+    from app.utils import support_utils  # noqa: PLC0415
+
+    factory = support_utils.SupportUtils()
+    factory.config_obj = config_obj
+    slots: dict[int, _WorkerSlot] = {}
+    while True:
+        try:
+            message = conn.recv_bytes()
+        except EOFError:
+            break
+        op, slot_id, n_samples = REQUEST.unpack_from(message)
+        n_results = 0
+        memory_bytes = 0
+        try:
+            if op == Op.OPEN:
+                audio_name, score_name, *names = message[REQUEST.size :].decode().split("\n")
+                slots[slot_id] = _WorkerSlot(
+                    shared_ring.SharedRing.attach(audio_name, np.int16),
+                    shared_ring.SharedRing.attach(score_name, np.float32),
+                    [wakeword for wakeword in config_obj.wakeword_models if wakeword.name in names],
+                )
+            elif op == Op.CLOSE:
+                slots.pop(slot_id).close()
+            elif op in MEMORY_OPS:
+                memory_bytes = slots[slot_id].memory_op(Op(op))
+                n_results = 1
+            else:
+                slot = slots[slot_id]
+                audio = slot.audio_ring.read(n_samples)
+                if op == Op.WAKEWORD:
+                    scores = slot.wakeword(factory).scores(audio)
+                    results = np.array(list(scores.values()), dtype=np.float32)
+                else:
+                    probability = slot.vad_model(factory).probability(audio.tobytes())
+                    results = np.array([probability], dtype=np.float32)
+                slot.score_ring.write(results)
+                n_results = results.size
+        except Exception as e:
+            logger.exception("Inference worker failed on op %d for slot %d: %s", op, slot_id, e)
+        # Reported on every reply, scoring a long batch wakes a hibernated model on its own
+        hibernated = slot_id in slots and slots[slot_id].hibernated
+        conn.send_bytes(REPLY.pack(op, slot_id, n_results, hibernated, memory_bytes))
+    for slot in slots.values():
+        slot.close()
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.process.BaseProcess, conn: Connection) -> None:
+        self.process = process
+        self.conn = conn
+        self.sessions: dict[int, RemoteInference] = {}
+        # The worker answers strictly in request order
+        self.pending: deque[tuple[int, asyncio.Future[Reply]]] = deque()
+        # Cleared once its pipe breaks; a dead worker gets no new sessions or requests
+        self.alive = True
+
+
+class InferenceWorkerPool:
+    """Runs wakeword and VAD inference for many sessions in a pool of worker processes.
+
+    Sessions are sharded across the workers, each worker owns the models of its sessions.
+    Audio and scores travel through per-session shared-memory rings; the pipe to the worker
+    only carries fixed-size request/reply headers, so nothing is pickled per frame.
+    """
+
+    def __init__(self, n_workers: int, config_obj: config.Config, ring_seconds: float = 4.0) -> None:
+        self.n_workers = n_workers
+        self.config_obj = config_obj
+        self.ring_seconds = ring_seconds
+        self._workers: list[_Worker] = []
+        self._slot_ids = itertools.count(1)
+
+    def start(self) -> None:
+        # Spawn rather than fork, the parent runs an event loop and threads
+        context = multiprocessing.get_context("spawn")
+        loop = asyncio.get_running_loop()
+        for i in range(self.n_workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=worker_main, args=(child_conn, self.config_obj), name=f"inference-worker-{i}", daemon=True
+            )
+            process.start()
+            child_conn.close()
+            worker = _Worker(process, parent_conn)
+            loop.add_reader(parent_conn.fileno(), self._on_reply, worker)
+            self._workers.append(worker)
+        logger.info("Started %d inference workers", self.n_workers)
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            loop.remove_reader(worker.conn.fileno())
+            worker.conn.close()
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, 5.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._workers.clear()
+
+    async def open_session(self, samplerate: int, wakewords: list[config.WakewordModel]) -> RemoteInference:
+        if not self._workers:
+            raise ValueError("Inference worker pool is not started")
+        workers = [worker for worker in self._workers if worker.alive]
+        if not workers:
+            raise RuntimeError("All inference workers died")
+        worker = min(workers, key=lambda w: len(w.sessions))
+        capacity = int(self.ring_seconds * samplerate)
+        session = RemoteInference(
+            self,
+            worker,
+            next(self._slot_ids),
+            shared_ring.SharedRing.create(capacity, np.int16),
+            shared_ring.SharedRing.create(len(wakewords) * 16, np.float32),
+            [wakeword.name for wakeword in wakewords],
+        )
+        worker.sessions[session.slot_id] = session
+        payload = "\n".join([session.audio_ring.name, session.score_ring.name, *session.wakeword_names])
+        try:
+            await self._request(worker, Op.OPEN, session.slot_id, 0, payload.encode())
+        except (RuntimeError, OSError):
+            await session.close()
+            raise
+        return session
+
+    async def _request(self, worker: _Worker, op: Op, slot_id: int, n_samples: int, payload: bytes = b"") -> Reply:
+        if not worker.alive:
+            raise RuntimeError("Inference worker died")
+        future: asyncio.Future[Reply] = asyncio.get_running_loop().create_future()
+        worker.pending.append((slot_id, future))
+        try:
+            worker.conn.send_bytes(REQUEST.pack(op, slot_id, n_samples) + payload)
+        except OSError:
+            # The pipe broke before the reader noticed, no reply will come for this request
+            worker.pending.remove((slot_id, future))
+            raise
+        return await future
+
+    def _on_reply(self, worker: _Worker) -> None:
+        try:
+            while worker.conn.poll():
+                op, slot_id, n_results, hibernated, memory_bytes = REPLY.unpack(worker.conn.recv_bytes())
+                _, future = worker.pending.popleft()
+                if slot_id in worker.sessions:
+                    worker.sessions[slot_id].hibernated = hibernated
+                if not future.done():
+                    future.set_result(Reply(n_results, hibernated, memory_bytes))
+                elif slot_id in worker.sessions and n_results and op not in MEMORY_OPS:
+                    # The caller gave up waiting, drop the late scores so they are not read as the next ones
+                    worker.sessions[slot_id].score_ring.read(n_results)
+        except (EOFError, OSError):
+            logger.error("Inference worker %s died", worker.process.name)
+            worker.alive = False
+            asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+            for _, future in worker.pending:
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference worker died"))
+            worker.pending.clear()
+
+
+class RemoteInference:
+    """Session handle on an InferenceWorkerPool, see inference.Inference."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        pool: InferenceWorkerPool,
+        worker: _Worker,
+        slot_id: int,
+        audio_ring: shared_ring.SharedRing,
+        score_ring: shared_ring.SharedRing,
+        wakeword_names: list[str],
+    ) -> None:
+        self.pool = pool
+        self.worker = worker
+        self.slot_id = slot_id
+        self.audio_ring = audio_ring
+        self.score_ring = score_ring
+        self.wakeword_names = wakeword_names
+        # Mirrors the worker's slot, updated by every reply
+        self.hibernated = False
+
+    async def _run(self, op: Op, audio: np_typing.NDArray[np.int16]) -> np.ndarray:
+        self.audio_ring.write(audio)
+        reply = await self.pool._request(self.worker, op, self.slot_id, audio.size)
+        if reply.n_results == 0:
+            raise RuntimeError(f"Inference worker failed on {op.name}")
+        return self.score_ring.read(reply.n_results)
+
+    async def _run_pieces(self, op: Op, audio: np_typing.NDArray[np.int16], window_samples: int) -> np.ndarray:
+        """Run op on audio in pieces that fit the ring and return the maximum of each result.
+
+        A pre-roll replay or a long client frame can exceed the ring. Pieces are whole model
+        windows and both models report the maximum over their windows, so the results match
+        those of a single call.
+        """
+        piece_samples = max(window_samples, self.audio_ring.capacity - self.audio_ring.capacity % window_samples)
+        results = [await self._run(op, audio[i : i + piece_samples]) for i in range(0, audio.size, piece_samples)]
+        maximum: np.ndarray = np.max(results, axis=0)
+        return maximum
+
+    async def wakeword_scores(self, audio: np_typing.NDArray[np.int16]) -> dict[str, float]:
+        scores = await self._run_pieces(Op.WAKEWORD, audio, inference.OWW_CHUNK_SAMPLES)
+        return dict(zip(self.wakeword_names, scores.tolist(), strict=True))
+
+    async def speech_probability(self, audio_bytes: bytes) -> float:
+        audio = np.frombuffer(audio_bytes, dtype=np.int16)
+        return float((await self._run_pieces(Op.VAD, audio, silero_vad.CHUNK_SAMPLES))[0])
+
+    async def _memory_op(self, op: Op) -> int:
+        reply = await self.pool._request(self.worker, op, self.slot_id, 0)
+        if reply.n_results == 0:
+            raise RuntimeError(f"Inference worker failed on {op.name}")
+        return reply.memory_bytes + self.audio_ring.shm.size + self.score_ring.shm.size
+
+    async def hibernate(self) -> int:
+        return await self._memory_op(Op.HIBERNATE)
+
+    async def wake(self) -> int:
+        return await self._memory_op(Op.WAKE)
+
+    async def memory_bytes(self) -> int:
+        return await self._memory_op(Op.MEMORY)
+
+    async def close(self) -> None:
+        try:
+            await self.pool._request(self.worker, Op.CLOSE, self.slot_id, 0)
+        except (RuntimeError, OSError) as e:
+            # Runs while a session is torn down, a dead worker must not stop the rest of the cleanup
+            logger.warning("Closing inference slot %d failed: %s", self.slot_id, e)
+        finally:
+            self.worker.sessions.pop(self.slot_id, None)
+            self.audio_ring.close()
+            self.score_ring.close()
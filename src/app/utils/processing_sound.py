@@ -3,13 +3,14 @@ import uuid
 from dataclasses import dataclass
 
 import numpy as np
-from fastapi import WebSocket, WebSocketDisconnect
+from fastapi import WebSocketDisconnect
 from private_assistant_commons import messages
 
 from app.utils import (
-    client_config,
+    client_session,
     config,
     support_utils,
+    tracing,
 )
 from app.utils import (
     speech_recognition_tools as srt,
@@ -19,7 +20,7 @@ from app.utils import (
 @dataclass
 class AudioConfig:
     max_frames: int
-    max_silent_packages: int
+    max_silent_samples: int
     vad_threshold: float
     # AIDEV-NOTE: Added buffer size limits to prevent memory accumulation
     max_buffer_size: int = 1024 * 1024  # 1MB max buffer size
@@ -28,32 +29,37 @@ class AudioConfig:
 class AudioProcessor:
     def __init__(
         self,
-        websocket: WebSocket,
+        session: client_session.ClientSession,
         sup_util: support_utils.SupportUtils,
         config_obj: config.Config,
-        client_conf: client_config.ClientConfig,
         logger: logging.Logger,
+        command_trace: tracing.CommandTrace,
     ) -> None:
-        self.websocket = websocket
+        client_conf = session.client_conf
+        self.websocket = session.websocket
+        self.channel = session.channel
+        self.framer = session.vad_framer
+        self.inference = session.inference
+        self.traces = session.traces
+        self.command_trace = command_trace
+        self._capture_span = command_trace.start_span("capture")
         self.sup_util = sup_util
         self.audio_config = AudioConfig(
             max_frames=config_obj.max_command_input_seconds * client_conf.samplerate,
-            max_silent_packages=int(
-                client_conf.samplerate / client_conf.chunk_size * config_obj.max_length_speech_pause
-            ),
+            max_silent_samples=int(client_conf.samplerate * config_obj.max_length_speech_pause),
             vad_threshold=config_obj.vad_threshold,
         )
         self.config_obj = config_obj
         self.client_conf = client_conf
         self.audio_frames: np.ndarray | None = None
-        self.silence_packages: int = 0
+        self.silent_samples: int = 0
         self.logger = logger
         # AIDEV-NOTE: Track buffer size to prevent memory accumulation
         self._buffer_size_bytes: int = 0
 
     async def handle_voice_packet(self, data: np.ndarray) -> None:
         # AIDEV-NOTE: Improved buffer management with size limits
-        self.silence_packages = 0
+        self.silent_samples = 0
         
         if self.audio_frames is None:
             self.audio_frames = data
@@ -81,7 +87,7 @@ class AudioProcessor:
             
             self.audio_frames = np.concatenate((self.audio_frames, data))
             self._buffer_size_bytes += data.nbytes
-            self.silence_packages += 1
+            self.silent_samples += data.size
         self.logger.debug("No voice... (buffer size: %d bytes)", self._buffer_size_bytes)
 
     async def process_complete_audio(self) -> None:
@@ -90,11 +96,21 @@ class AudioProcessor:
 
         try:
             await self.websocket.send_text("stop_listening")
+            self.channel.mark_command_end()
+            self._end_capture()
             self.logger.info("Requested transcription...")
 
-            response = await srt.send_audio_to_stt_api(self.audio_frames, config_obj=self.config_obj)
+            with self.command_trace.span("stt") as span:
+                span.set_attribute("audio_seconds", self.audio_frames.shape[0] / self.client_conf.samplerate)
+                response = await srt.send_audio_to_stt_api(
+                    self.audio_frames,
+                    config_obj=self.config_obj,
+                    pool=self.sup_util.stt_pool,
+                    client=self.sup_util.http_client,
+                )
             if response is None:
                 self.logger.error("Failed to get STT response")
+                self.command_trace.end("transcription failed")
                 return
 
             self.logger.info("Received result...")
@@ -107,23 +123,33 @@ class AudioProcessor:
                 output_topic=self.client_conf.output_topic,
             )
 
-            await self.sup_util.mqtt_client.publish(
-                self.config_obj.input_topic,
-                request.model_dump_json(),
-                qos=1,
-            )
+            with self.command_trace.span("mqtt_publish"):
+                await self.sup_util.mqtt_client.publish(
+                    self.config_obj.input_topic,
+                    request.model_dump_json(),
+                    qos=1,
+                )
             self.logger.info("Published result text to MQTT")
+            if self.command_trace.request_id is None:
+                self.command_trace.await_response(str(request.id))
+                tracing.track(self.traces, self.command_trace)
 
         except Exception as e:
             self.logger.error("Error processing audio: %s", str(e))
+            self.command_trace.end(str(e))
             raise
 
     async def process_audio_stream(self) -> None:
         try:
             while True:
-                audio_bytes = await self.websocket.receive_bytes()
-                speech_prob: float = self.sup_util.vad_model(audio_bytes)
-                raw_audio: np.ndarray = np.frombuffer(audio_bytes, dtype=np.int16)
+                audio_bytes = self.channel.unwrap(await self.websocket.receive_bytes())
+                if audio_bytes is None:
+                    continue
+                # AIDEV-NOTE: VAD scores whole windows only, frames of any size are re-chunked first
+                raw_audio = self.framer.push(np.frombuffer(audio_bytes, dtype=np.int16))
+                if raw_audio is None:
+                    continue
+                speech_prob = await self.inference.speech_probability(raw_audio.tobytes())
                 data: np.ndarray = srt.int2float(raw_audio)
 
                 if speech_prob > self.audio_config.vad_threshold:
@@ -141,30 +167,39 @@ class AudioProcessor:
             self.logger.error("Error in audio processing: %s", str(e))
             raise
         finally:
+            if self.command_trace.request_id is None:
+                # Never reached the assistant, no reply will finish the trace
+                self._end_capture()
+                self.command_trace.end("command not published")
             await self.cleanup()
 
+    def _end_capture(self) -> None:
+        if self._capture_span.is_recording():
+            self._capture_span.end()
+
     def should_process_audio(self) -> bool:
         if self.audio_frames is None:
             return False
         return (
             self.audio_frames.shape[0] > self.audio_config.max_frames
-            or self.silence_packages >= self.audio_config.max_silent_packages
+            or self.silent_samples >= self.audio_config.max_silent_samples
         )
 
     async def cleanup(self) -> None:
         # AIDEV-NOTE: Enhanced cleanup to prevent memory leaks
         self.audio_frames = None
-        self.silence_packages = 0
+        self.silent_samples = 0
         self._buffer_size_bytes = 0
+        self.framer.reset()
         self.logger.debug("Audio processor cleaned up")
 
 
 async def processing_spoken_commands(
-    websocket: WebSocket,
+    session: client_session.ClientSession,
     sup_util: support_utils.SupportUtils,
     config_obj: config.Config,
-    client_conf: client_config.ClientConfig,
     logger: logging.Logger,
+    command_trace: tracing.CommandTrace,
 ) -> None:
-    processor = AudioProcessor(websocket, sup_util, config_obj, client_conf, logger=logger)
+    processor = AudioProcessor(session, sup_util, config_obj, logger=logger, command_trace=command_trace)
     await processor.process_audio_stream()
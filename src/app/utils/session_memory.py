@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.utils import client_session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionMemory:
+    """Estimated memory held by one session, excluding model weights."""
+
+    room: str
+    inference_bytes: int
+    preroll_bytes: int
+    hibernated: bool
+    idle_seconds: float
+
+    @property
+    def total_bytes(self) -> int:
+        return self.inference_bytes + self.preroll_bytes
+
+
+async def measure(session: client_session.ClientSession, now: float | None = None) -> SessionMemory:
+    now = time.monotonic() if now is None else now
+    session.memory = SessionMemory(
+        room=session.client_conf.room,
+        inference_bytes=await session.inference.memory_bytes(),
+        preroll_bytes=session.gate.preroll_bytes,
+        hibernated=session.inference.hibernated,
+        idle_seconds=now - session.last_activity,
+    )
+    return session.memory
+
+
+async def mark_active(session: client_session.ClientSession) -> None:
+    """Record activity on the session and give it back its full buffers if it was hibernating."""
+    session.last_activity = time.monotonic()
+    if session.inference.hibernated:
+        await session.inference.wake()
+        logger.debug("Session in %s woke up", session.client_conf.room)
+
+
+async def reclaim(
+    sessions: list[client_session.ClientSession], idle_seconds: float, budget_bytes: int
+) -> tuple[int, bool]:
+    """Hibernate idle sessions and, while over budget, the longest idle remaining ones.
+
+    Returns the estimated total and whether it still exceeds the budget. An idle_seconds or
+    budget_bytes of 0 disables the respective rule.
+    """
+    now = time.monotonic()
+    total = 0
+    measured = []
+    # A snapshot, sessions may close while the sweep awaits their inference
+    for session in list(sessions):
+        try:
+            total += (await measure(session, now)).total_bytes
+        except Exception:
+            logger.exception("Could not measure session in %s", session.client_conf.room)
+            continue
+        measured.append(session)
+    for session in sorted(measured, key=lambda s: s.last_activity):
+        if session.memory is None:
+            continue
+        if session not in sessions:
+            # Closed during the sweep, its memory is released and its inference is gone
+            total -= session.memory.total_bytes
+            continue
+        if session.inference.hibernated:
+            continue
+        idle = idle_seconds > 0 and session.memory.idle_seconds >= idle_seconds
+        over_budget = budget_bytes > 0 and total > budget_bytes
+        if not (idle or over_budget):
+            continue
+        before = session.memory.total_bytes
+        try:
+            session.memory.inference_bytes = await session.inference.hibernate()
+        except Exception:
+            logger.exception("Could not hibernate session in %s", session.client_conf.room)
+            continue
+        session.memory.hibernated = session.inference.hibernated
+        total -= before - session.memory.total_bytes
+        logger.info(
+            "Hibernated session in %s (%s), %d -> %d bytes",
+            session.client_conf.room,
+            "idle" if idle else "memory budget",
+            before,
+            session.memory.total_bytes,
+        )
+    return total, budget_bytes > 0 and total > budget_bytes
@@ -0,0 +1,73 @@
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import numpy.typing as np_typing
+
+# write index, read index; monotonically increasing sample counters
+HEADER_ITEMS = 2
+HEADER_BYTES = HEADER_ITEMS * np.dtype(np.uint64).itemsize
+
+
+class SharedRing:
+    """Single-producer single-consumer ring buffer in shared memory.
+
+    One process writes samples, another reads them; only the two counters in the header
+    are shared state, so no lock is needed as long as each side sticks to its role. The
+    producer signals new data out of band (a pipe), which also orders the memory accesses.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, dtype: np_typing.DTypeLike, owner: bool) -> None:
+        self.shm = shm
+        self.dtype = np.dtype(dtype)
+        self.owner = owner
+        self.capacity = (shm.size - HEADER_BYTES) // self.dtype.itemsize
+        self._header: np_typing.NDArray[np.uint64] = np.ndarray((HEADER_ITEMS,), dtype=np.uint64, buffer=shm.buf)
+        self._data: np.ndarray = np.ndarray((self.capacity,), dtype=self.dtype, buffer=shm.buf, offset=HEADER_BYTES)
+
+    @classmethod
+    def create(cls, capacity: int, dtype: np_typing.DTypeLike) -> "SharedRing":
+        size = HEADER_BYTES + capacity * np.dtype(dtype).itemsize
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), dtype, owner=True)
+        ring._header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, dtype: np_typing.DTypeLike) -> "SharedRing":
+        shm = shared_memory.SharedMemory(name=name)
+        # AIDEV-NOTE: Before Python 3.13 attaching registers the segment with the resource
+        # tracker too, which would unlink it when this process exits. Only the owner cleans up.
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        return cls(shm, dtype, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def available(self) -> int:
+        return int(self._header[0] - self._header[1])
+
+    def write(self, samples: np.ndarray) -> None:
+        n = samples.size
+        if n > self.capacity - self.available():
+            raise ValueError(f"Ring buffer overflow: {n} samples, {self.capacity - self.available()} free")
+        start = int(self._header[0] % self.capacity)
+        first = min(n, self.capacity - start)
+        self._data[start : start + first] = samples[:first]
+        self._data[: n - first] = samples[first:]
+        self._header[0] += n
+
+    def read(self, n: int) -> np.ndarray:
+        if n > self.available():
+            raise ValueError(f"Ring buffer underflow: {n} samples requested, {self.available()} available")
+        start = int(self._header[1] % self.capacity)
+        first = min(n, self.capacity - start)
+        out: np.ndarray = np.concatenate((self._data[start : start + first], self._data[: n - first]))
+        self._header[1] += n
+        return out
+
+    def close(self) -> None:
+        # Views must be dropped before the mapping can be closed
+        del self._header, self._data
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
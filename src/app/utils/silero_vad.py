@@ -1,5 +1,8 @@
 from pysilero_vad import SileroVoiceActivityDetector
 
+# Samples per VAD window, fixed by the model
+CHUNK_SAMPLES = SileroVoiceActivityDetector.chunk_samples()
+
 
 class SileroVad:
     """Voice activity detection with silero VAD."""
@@ -17,6 +20,20 @@ class SileroVad:
             self.detector.reset()
             return False
 
+        if self.probability(audio_bytes) >= self.threshold:
+            # Speech detected
+            self._activation += 1
+            if self._activation >= self.trigger_level:
+                self._activation = 0
+                return True
+        else:
+            # Silence detected
+            self._activation = max(0, self._activation - 1)
+
+        return False
+
+    def probability(self, audio_bytes: bytes) -> float:
+        """Maximum speech probability over the VAD windows in audio_bytes."""
         chunk_size = self.detector.chunk_bytes()
         if len(audio_bytes) < chunk_size:
             raise ValueError(f"Audio bytes must be at least {chunk_size} bytes")
@@ -28,16 +45,4 @@ class SileroVad:
             speech_probs.append(self.detector(chunk))
 
         # Use maximum probability
-        max_prob = max(speech_probs)
-
-        if max_prob >= self.threshold:
-            # Speech detected
-            self._activation += 1
-            if self._activation >= self.trigger_level:
-                self._activation = 0
-                return True
-        else:
-            # Silence detected
-            self._activation = max(0, self._activation - 1)
-
-        return False
+        return max(speech_probs)
@@ -1,14 +1,24 @@
+import asyncio
 import logging
+import re
+from collections.abc import AsyncGenerator
+from contextlib import AbstractAsyncContextManager, nullcontext
 
 import httpx
 import numpy as np
 import numpy.typing as np_typing
 from pydantic import BaseModel, ValidationError
 
-from app.utils import config
+from app.utils import backend_pool, config
 
 logger = logging.getLogger(__name__)
 
+# Sentence-final punctuation and the whitespace after it; split_sentences also requires an
+# uppercase letter next, so colons, semicolons and lowercase continuations stay together
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+# Abbreviations whose period is followed by a capitalized word inside the same sentence
+ABBREVIATIONS = frozenset({"dr.", "mr.", "mrs.", "ms.", "prof.", "st.", "jr.", "sr.", "e.g.", "i.e.", "vs."})
+
 
 class STTResponse(BaseModel):
     text: str
@@ -23,19 +33,51 @@ def int2float(sound: np_typing.NDArray[np.int16]) -> np_typing.NDArray[np.float3
     return sound_32.squeeze()
 
 
+def _client_context(client: httpx.AsyncClient | None) -> AbstractAsyncContextManager[httpx.AsyncClient]:
+    """Use the shared client when given, creating a client per request is costly (TLS setup)."""
+    return httpx.AsyncClient() if client is None else nullcontext(client)
+
+
+def create_backend_pool(urls: list[str], config_obj: config.Config) -> backend_pool.BackendPool:
+    return backend_pool.BackendPool(
+        urls=urls,
+        routing=config_obj.backend_routing,
+        hedging=config_obj.backend_hedging,
+        hedge_percentile=config_obj.backend_hedge_percentile,
+        hedge_min_delay=config_obj.backend_hedge_min_delay,
+        failure_threshold=config_obj.backend_failure_threshold,
+        circuit_reset_seconds=config_obj.backend_circuit_reset_seconds,
+    )
+
+
 async def send_audio_to_stt_api(
     audio_data: np_typing.NDArray[np.float32],
     config_obj: config.Config,
-    timeout: float = 10.0,
+    timeout: float | None = None,
+    pool: backend_pool.BackendPool | None = None,
+    client: httpx.AsyncClient | None = None,
 ) -> STTResponse | None:
     """Send audio to STT API and receive transcription."""
+    request_timeout = config_obj.speech_api_timeout if timeout is None else timeout
+    if pool is None:
+        return await _post_audio(config_obj.speech_transcription_api, audio_data, config_obj, request_timeout, client)
+    return await pool.request(lambda url: _post_audio(url, audio_data, config_obj, request_timeout, client))
+
+
+async def _post_audio(
+    url: str,
+    audio_data: np_typing.NDArray[np.float32],
+    config_obj: config.Config,
+    timeout: float,
+    client: httpx.AsyncClient | None,
+) -> STTResponse | None:
     files = {"file": ("audio.raw", audio_data.tobytes())}
     headers = {"user-token": config_obj.speech_transcription_api_token or ""}
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config_obj.speech_transcription_api,
+        async with _client_context(client) as http_client:
+            response = await http_client.post(
+                url,
                 files=files,
                 headers=headers,
                 timeout=timeout,
@@ -55,13 +97,29 @@ async def send_audio_to_stt_api(
     return None
 
 
-async def send_text_to_tts_api(
+async def send_text_to_tts_api(  # noqa: PLR0913
     text: str,
     config_obj: config.Config,
     sample_rate: int = 16000,
-    timeout: float = 10.0,
+    timeout: float | None = None,
+    pool: backend_pool.BackendPool | None = None,
+    client: httpx.AsyncClient | None = None,
 ) -> bytes | None:
     """Send text to TTS API and receive audio data."""
+    request_timeout = config_obj.speech_api_timeout if timeout is None else timeout
+    if pool is None:
+        return await _post_text(config_obj.speech_synthesis_api, text, config_obj, sample_rate, request_timeout, client)
+    return await pool.request(lambda url: _post_text(url, text, config_obj, sample_rate, request_timeout, client))
+
+
+async def _post_text(  # noqa: PLR0913
+    url: str,
+    text: str,
+    config_obj: config.Config,
+    sample_rate: int,
+    timeout: float,
+    client: httpx.AsyncClient | None,
+) -> bytes | None:
     headers = {
         "user-token": config_obj.speech_synthesis_api_token or "",
         "Content-Type": "application/json",
@@ -70,9 +128,9 @@ async def send_text_to_tts_api(
     payload = {"text": text, "sample_rate": sample_rate}
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url=config_obj.speech_synthesis_api,
+        async with _client_context(client) as http_client:
+            response = await http_client.post(
+                url=url,
                 json=payload,
                 headers=headers,
                 timeout=timeout,
@@ -96,3 +154,68 @@ async def send_text_to_tts_api(
         logger.error("Audio conversion error: %s", e)
 
     return None
+
+
+def split_sentences(text: str, min_segment_chars: int = 0) -> list[str]:
+    """Split text at sentence boundaries, merging fragments shorter than min_segment_chars."""
+    text = text.strip()
+    sentences: list[str] = []
+    start = 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        words = text[start : boundary.start()].split()
+        if not text[boundary.end()].isupper() or (words and words[-1].lower() in ABBREVIATIONS):
+            continue
+        sentences.append(text[start : boundary.start()])
+        start = boundary.end()
+    sentences.append(text[start:])
+
+    segments: list[str] = []
+    for sentence in sentences:
+        if not sentence:
+            continue
+        if segments and len(segments[-1]) < min_segment_chars:
+            segments[-1] = f"{segments[-1]} {sentence}"
+        else:
+            segments.append(sentence)
+    return segments
+
+
+async def stream_text_to_tts_api(
+    text: str,
+    config_obj: config.Config,
+    sample_rate: int = 16000,
+    pool: backend_pool.BackendPool | None = None,
+    client: httpx.AsyncClient | None = None,
+) -> AsyncGenerator[bytes, None]:
+    """Synthesize text sentence by sentence and yield the audio segments in order.
+
+    Up to tts_max_parallel_segments sentences are synthesized concurrently, so the first
+    segment can be played while the rest of the answer is still being synthesized. The
+    stream ends at the first segment that fails, an answer with a sentence missing from its
+    middle could say something else entirely.
+    """
+    segments = split_sentences(text, config_obj.tts_min_segment_chars) if config_obj.tts_split_sentences else [text]
+    semaphore = asyncio.Semaphore(max(1, config_obj.tts_max_parallel_segments))
+
+    async def synthesize(segment: str) -> bytes | None:
+        async with semaphore:
+            return await send_text_to_tts_api(segment, config_obj, sample_rate=sample_rate, pool=pool, client=client)
+
+    # AIDEV-NOTE: Tasks are created in order so the semaphore admits them in order; a slow
+    # later segment never delays an earlier one.
+    tasks = [asyncio.create_task(synthesize(segment)) for segment in segments]
+    try:
+        for index, task in enumerate(tasks):
+            audio_bytes = await task
+            if audio_bytes is None:
+                logger.warning(
+                    "Synthesis of segment %d of %d failed, dropping the rest of the answer: %r",
+                    index + 1,
+                    len(segments),
+                    segments[index],
+                )
+                return
+            yield audio_bytes
+    finally:
+        for task in tasks:
+            task.cancel()
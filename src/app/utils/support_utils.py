@@ -2,27 +2,45 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import openwakeword
+from opentelemetry import trace
+
 from app.utils import (
+    backend_pool,
     config,
+    frame_protocol,
     silero_vad,
 )
 
 if TYPE_CHECKING:
     import asyncio
-    
+
     import aiomqtt as mqtt
-    import openwakeword
+    import httpx
     from private_assistant_commons import messages
 
+    from app.utils import client_session, inference_workers, tracing
+
 
 class SupportUtils:
     def __init__(self) -> None:
         self._config_obj: config.Config | None = None
-        self._wakeword_model: openwakeword.Model | None = None
         self._mqtt_client: mqtt.Client | None = None
         self.mqtt_subscription_to_queue: dict[str, asyncio.Queue[messages.Response]] = {}
+        # AIDEV-NOTE: websocket_connected means "no further session is accepted"; with
+        # max_sessions > 1 it only flips once every slot is taken.
         self.websocket_connected: bool = False
-        self.vad_model: silero_vad.SileroVad = silero_vad.SileroVad(0.6, 1)
+        self.active_sessions: int = 0
+        self.sessions: list[client_session.ClientSession] = []
+        self.stt_pool: backend_pool.BackendPool | None = None
+        self.tts_pool: backend_pool.BackendPool | None = None
+        self.http_client: httpx.AsyncClient | None = None
+        self.inference_pool: inference_workers.InferenceWorkerPool | None = None
+        self.latency_stats: dict[str, frame_protocol.LatencyStats] = {}
+        # Set by the reclaim loop when hibernating did not bring sessions under the memory budget
+        self.memory_budget_exceeded: bool = False
+        self.tracer: trace.Tracer = trace.NoOpTracer()
+        self.span_exporter: tracing.RecentSpanExporter | None = None
 
     @property
     def config_obj(self) -> config.Config:
@@ -34,16 +52,6 @@ class SupportUtils:
     def config_obj(self, value: config.Config) -> None:
         self._config_obj = value
 
-    @property
-    def wakeword_model(self) -> openwakeword.Model:
-        if self._wakeword_model is None:
-            raise ValueError("Wakeword model is not set")
-        return self._wakeword_model
-
-    @wakeword_model.setter
-    def wakeword_model(self, value: openwakeword.Model) -> None:
-        self._wakeword_model = value
-
     @property
     def mqtt_client(self) -> mqtt.Client:
         if self._mqtt_client is None:
@@ -53,3 +61,28 @@ class SupportUtils:
     @mqtt_client.setter
     def mqtt_client(self, value: mqtt.Client) -> None:
         self._mqtt_client = value
+
+    @property
+    def accepts_sessions(self) -> bool:
+        return not (self.websocket_connected or self.memory_budget_exceeded)
+
+    def reserve_session(self) -> None:
+        self.active_sessions += 1
+        self.websocket_connected = self.active_sessions >= self.config_obj.max_sessions
+
+    def release_session(self) -> None:
+        self.active_sessions = max(0, self.active_sessions - 1)
+        self.websocket_connected = self.active_sessions >= self.config_obj.max_sessions
+
+    def create_wakeword_model(self, wakewords: list[config.WakewordModel]) -> openwakeword.Model:
+        # One model for all wakewords: melspectrogram and embeddings are computed once per
+        # frame and shared, each extra wakeword only adds its small classifier
+        return openwakeword.Model(
+            wakeword_models=[wakeword.path_or_name for wakeword in wakewords],
+            enable_speex_noise_suppression=True,
+            vad_threshold=self.config_obj.vad_threshold,
+            inference_framework=self.config_obj.openwakeword_inference_framework,
+        )
+
+    def create_vad_model(self) -> silero_vad.SileroVad:
+        return silero_vad.SileroVad(threshold=self.config_obj.vad_threshold, trigger_level=1)
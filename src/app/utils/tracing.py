@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
+from opentelemetry.trace import Status, StatusCode
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from private_assistant_commons import messages
+
+SERVICE_NAME = "comms-bridge"
+# Commands whose reply never arrives are ended after this many newer ones are waiting
+MAX_PENDING_TRACES = 8
+
+
+class RecentSpanExporter(SpanExporter):
+    """Keeps the most recently finished spans in memory, grouped by trace for the /traces endpoint."""
+
+    def __init__(self, max_spans: int = 1000) -> None:
+        self.spans: deque[ReadableSpan] = deque(maxlen=max_spans)
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        self.spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        self.spans.clear()
+
+    def traces(self) -> dict[str, list[dict]]:
+        grouped: dict[str, list[dict]] = {}
+        for span in self.spans:
+            context = span.get_span_context()
+            if context is None or span.start_time is None or span.end_time is None:
+                continue
+            grouped.setdefault(trace.format_trace_id(context.trace_id), []).append(
+                {
+                    "name": span.name,
+                    "span_id": trace.format_span_id(context.span_id),
+                    "parent_id": trace.format_span_id(span.parent.span_id) if span.parent else None,
+                    "start_time_ns": span.start_time,
+                    "duration_ms": (span.end_time - span.start_time) / 1e6,
+                    "status": span.status.status_code.name,
+                    "attributes": dict(span.attributes or {}),
+                }
+            )
+        return grouped
+
+
+def create_tracer_provider(sample_rate: float, exporter: SpanExporter) -> TracerProvider:
+    # AIDEV-NOTE: Sampling is decided once per command on the root span; unsampled commands
+    # get non-recording spans, which cost next to nothing.
+    provider = TracerProvider(
+        sampler=TraceIdRatioBased(sample_rate), resource=Resource.create({"service.name": SERVICE_NAME})
+    )
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider
+
+
+class CommandTrace:
+    """Spans of one spoken command, from the wakeword to the last byte of the reply.
+
+    The assistant's Response carries no request id, so a reply is matched to the oldest
+    command of the same session still waiting for one.
+    """
+
+    def __init__(self, tracer: trace.Tracer, room: str, wakewords: list[str]) -> None:
+        self.tracer = tracer
+        self.root = tracer.start_span("command", attributes={"room": room, "wakewords": wakewords})
+        self.root.add_event("wakeword_detected")
+        self._context = trace.set_span_in_context(self.root)
+        self.request_id: str | None = None
+        self.response: messages.Response | None = None
+        self._waiting: trace.Span | None = None
+        self._ended = False
+
+    def start_span(self, name: str) -> trace.Span:
+        return self.tracer.start_span(name, context=self._context)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[trace.Span]:
+        with trace.use_span(self.start_span(name), end_on_exit=True) as span:
+            yield span
+
+    def await_response(self, request_id: str) -> None:
+        self.request_id = request_id
+        self.root.set_attribute("request_id", request_id)
+        self._waiting = self.start_span("assistant")
+
+    def response_arrived(self, response: messages.Response) -> None:
+        self.response = response
+        if self._waiting is not None:
+            self._waiting.end()
+            self._waiting = None
+
+    def end(self, error: str | None = None) -> None:
+        if self._ended:
+            return
+        self._ended = True
+        if self._waiting is not None:
+            self._waiting.set_status(Status(StatusCode.ERROR, error or "no response"))
+            self._waiting.end()
+        if error is not None:
+            self.root.set_status(Status(StatusCode.ERROR, error))
+        self.root.end()
+
+
+def track(traces: deque[CommandTrace], command_trace: CommandTrace) -> None:
+    traces.append(command_trace)
+    while len(traces) > MAX_PENDING_TRACES:
+        traces.popleft().end("no response")
+
+
+def match_response(traces: deque[CommandTrace], response: messages.Response) -> None:
+    for command_trace in traces:
+        if command_trace.response is None:
+            command_trace.response_arrived(response)
+            return
+
+
+def take(traces: deque[CommandTrace], response: messages.Response) -> CommandTrace | None:
+    for command_trace in traces:
+        if command_trace.response is response:
+            traces.remove(command_trace)
+            return command_trace
+    return None
@@ -0,0 +1,119 @@
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from enum import StrEnum
+
+import numpy as np
+import numpy.typing as np_typing
+
+from app.utils.audio_framer import AudioFramer
+
+logger = logging.getLogger(__name__)
+
+
+class GateMode(StrEnum):
+    OFF = "off"
+    ENERGY = "energy"
+    VAD = "vad"
+    ENERGY_AND_VAD = "energy_vad"
+
+
+def frame_rms(audio: np_typing.NDArray[np.int16]) -> float:
+    if audio.size == 0:
+        return 0.0
+    samples = audio.astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples)))
+
+
+class WakewordGate:
+    """Cheap pre-gate that keeps silent audio away from the wakeword model.
+
+    While the room is quiet frames are held in a pre-roll buffer instead of being scored.
+    When a frame passes the gate the pre-roll is handed to the model together with it, so
+    the model's feature buffers hold the same context they would have had without gating
+    and a wakeword spoken right after silence is not cut off. After activity the gate stays
+    open for a hangover period to cover short pauses inside the wakeword.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        mode: GateMode = GateMode.OFF,
+        rms_threshold: float = 100.0,
+        vad_threshold: float = 0.3,
+        vad_probability: Callable[[bytes], Awaitable[float]] | None = None,
+        preroll_samples: int = 32000,
+        hangover_samples: int = 32000,
+        vad_window_samples: int | None = None,
+    ) -> None:
+        if mode in (GateMode.VAD, GateMode.ENERGY_AND_VAD) and vad_probability is None:
+            raise ValueError(f"Gate mode {mode} needs a VAD")
+        self.mode = mode
+        self.rms_threshold = rms_threshold
+        self.vad_threshold = vad_threshold
+        self.vad_probability = vad_probability
+        self.preroll_samples = preroll_samples
+        self.hangover_samples = hangover_samples
+        # Frames arrive in wakeword model windows, the VAD gets whole windows of its own
+        self._vad_framer = AudioFramer(vad_window_samples) if vad_window_samples else None
+        self._preroll: deque[np_typing.NDArray[np.int16]] = deque()
+        self._preroll_size = 0
+        self._hangover = 0
+        self.frames_seen = 0
+        self.frames_scored = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._hangover > 0
+
+    @property
+    def preroll_bytes(self) -> int:
+        return self._preroll_size * np.dtype(np.int16).itemsize
+
+    async def is_active(self, audio: np_typing.NDArray[np.int16]) -> bool:
+        if self.mode == GateMode.OFF:
+            return True
+        if self.mode in (GateMode.ENERGY, GateMode.ENERGY_AND_VAD) and frame_rms(audio) < self.rms_threshold:
+            if self._vad_framer is not None:
+                # The VAD skips this frame, a carried-over tail would be joined across the gap
+                self._vad_framer.reset()
+            return False
+        if self.mode in (GateMode.VAD, GateMode.ENERGY_AND_VAD) and self.vad_probability is not None:
+            if self._vad_framer is not None:
+                windows = self._vad_framer.push(audio)
+                if windows is None:
+                    return False
+                audio = windows
+            return await self.vad_probability(audio.tobytes()) >= self.vad_threshold
+        return True
+
+    async def process(self, audio: np_typing.NDArray[np.int16]) -> np_typing.NDArray[np.int16] | None:
+        """Return the audio the wakeword model should score now, or None to skip this frame."""
+        self.frames_seen += 1
+        if await self.is_active(audio):
+            self._hangover = self.hangover_samples
+            if self._preroll:
+                self._preroll.append(audio)
+                audio = np.concatenate(self._preroll)
+                self._clear_preroll()
+            self.frames_scored += 1
+            return audio
+        if self._hangover > 0:
+            self._hangover -= audio.size
+            self.frames_scored += 1
+            return audio
+        self._preroll.append(audio)
+        self._preroll_size += audio.size
+        # Without a pre-roll the frame itself is dropped and the deque runs empty
+        while self._preroll and self._preroll_size - self._preroll[0].size >= self.preroll_samples:
+            self._preroll_size -= self._preroll.popleft().size
+        return None
+
+    def reset(self) -> None:
+        self._clear_preroll()
+        self._hangover = 0
+        if self._vad_framer is not None:
+            self._vad_framer.reset()
+
+    def _clear_preroll(self) -> None:
+        self._preroll.clear()
+        self._preroll_size = 0
@@ -0,0 +1,30 @@
+import asyncio
+from collections import deque
+from types import SimpleNamespace
+from typing import Any
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.texts: list[str] = []
+        self.audio: list[bytes] = []
+
+    async def send_text(self, text: str) -> None:
+        self.texts.append(text)
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.audio.append(data)
+
+
+def fake_session() -> Any:
+    return SimpleNamespace(
+        websocket=FakeWebSocket(),
+        client_conf=SimpleNamespace(samplerate=16000, room="kitchen"),
+        output_queue=asyncio.Queue(),
+        channel=SimpleNamespace(wrap=lambda audio: audio),
+        last_activity=0.0,
+        inference=SimpleNamespace(hibernated=False),
+        playback=None,
+        playback_until=0.0,
+        traces=deque(),
+    )
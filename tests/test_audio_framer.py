@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from app.utils.audio_framer import AudioFramer
+
+WINDOW = 512
+
+
+def test_frames_of_any_size_yield_exact_windows():
+    rng = np.random.default_rng(0)
+    audio = np.arange(20 * WINDOW, dtype=np.int16)
+    framer = AudioFramer(WINDOW)
+    blocks = []
+    start = 0
+    while start < audio.size:
+        size = int(rng.integers(1, 3 * WINDOW))
+        block = framer.push(audio[start : start + size])
+        if block is not None:
+            assert block.size % WINDOW == 0
+            blocks.append(block)
+        start += size
+    out = np.concatenate(blocks)
+    np.testing.assert_array_equal(out, audio[: out.size])
+    assert out.size + framer.pending_samples == audio.size
+
+
+def test_aligned_frames_are_not_copied():
+    framer = AudioFramer(WINDOW)
+    frame = np.zeros(2 * WINDOW, dtype=np.int16)
+    block = framer.push(frame)
+    assert block is not None
+    assert np.shares_memory(block, frame)
+
+
+def test_short_frames_accumulate_and_reset_drops_them():
+    framer = AudioFramer(WINDOW)
+    assert framer.push(np.ones(WINDOW // 2, dtype=np.int16)) is None
+    block = framer.push(np.full(WINDOW, 2, dtype=np.int16))
+    assert block is not None
+    assert block.size == WINDOW
+    assert framer.pending_samples == WINDOW // 2
+
+    framer.reset()
+    assert framer.push(np.ones(WINDOW // 2, dtype=np.int16)) is None
+    assert framer.pending_samples == WINDOW // 2
+
+
+def test_window_must_be_positive():
+    with pytest.raises(ValueError):
+        AudioFramer(0)
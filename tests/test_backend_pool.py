@@ -0,0 +1,156 @@
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from app.utils.backend_pool import MIN_HEDGE_SAMPLES, BackendPool, RoutingStrategy
+
+FAST = "http://fast"
+SLOW = "http://slow"
+BROKEN = "http://broken"
+
+
+class StubBackends:
+    """Local stand-ins for STT/TTS servers with injected latency."""
+
+    def __init__(self, latencies: dict[str, float], tail_every: int = 0, tail_latency: float = 0.0) -> None:
+        self.latencies = latencies
+        self.tail_every = tail_every
+        self.tail_latency = tail_latency
+        self.calls: dict[str, int] = dict.fromkeys(latencies, 0)
+        self._counter = itertools.count(1)
+
+    async def __call__(self, url: str) -> str | None:
+        self.calls[url] += 1
+        delay = self.latencies[url]
+        if delay < 0:
+            return None
+        # Every n-th request hits a stall on whichever backend it lands on
+        if self.tail_every and next(self._counter) % self.tail_every == 0:
+            delay = self.tail_latency
+        await asyncio.sleep(delay)
+        return url
+
+
+def _run_sequential(pool: BackendPool, stubs: StubBackends, requests: int, warmup: int = 0) -> list[float]:
+    async def run() -> list[float]:
+        latencies = []
+        for i in range(warmup + requests):
+            start = time.monotonic()
+            assert await pool.request(stubs) is not None
+            if i >= warmup:
+                latencies.append(time.monotonic() - start)
+        return latencies
+
+    return asyncio.run(run())
+
+
+def test_least_outstanding_spreads_concurrent_requests():
+    stubs = StubBackends({FAST: 0.01, SLOW: 0.01})
+    pool = BackendPool(urls=[FAST, SLOW])
+
+    async def run() -> None:
+        await asyncio.gather(*(pool.request(stubs) for _ in range(4)))
+
+    asyncio.run(run())
+    assert stubs.calls == {FAST: 2, SLOW: 2}
+
+
+def test_least_latency_prefers_fast_backend():
+    stubs = StubBackends({FAST: 0.001, SLOW: 0.02})
+    pool = BackendPool(urls=[SLOW, FAST], routing=RoutingStrategy.LEAST_LATENCY)
+    _run_sequential(pool, stubs, 10)
+    min_fast_calls = 8
+    assert stubs.calls[FAST] >= min_fast_calls
+
+
+def test_failover_and_circuit_breaker():
+    stubs = StubBackends({BROKEN: -1, FAST: 0.001})
+    pool = BackendPool(urls=[BROKEN, FAST], failure_threshold=2, circuit_reset_seconds=60)
+    _run_sequential(pool, stubs, 6)
+    # After two failures the broken backend is skipped entirely
+    expected_broken_calls = 2
+    assert stubs.calls[BROKEN] == expected_broken_calls
+    expected_fast_calls = 6
+    assert stubs.calls[FAST] == expected_fast_calls
+
+
+def test_single_backend_keeps_being_tried_when_circuit_open():
+    stubs = StubBackends({BROKEN: -1})
+    pool = BackendPool(urls=[BROKEN], failure_threshold=1)
+
+    async def run() -> bool:
+        return await pool.request(stubs) is None
+
+    assert asyncio.run(run())
+    assert asyncio.run(run())
+    expected_calls = 2
+    assert stubs.calls[BROKEN] == expected_calls
+
+
+class StallingBackends:
+    """Backends that answer at once, except the stalled ones, which wait until released."""
+
+    def __init__(self, stalled: set[str]) -> None:
+        self.stalled = stalled
+        self.release = asyncio.Event()
+        self.calls: list[str] = []
+        self.cancelled: list[str] = []
+
+    async def __call__(self, url: str) -> str:
+        self.calls.append(url)
+        if url in self.stalled:
+            try:
+                await self.release.wait()
+            except asyncio.CancelledError:
+                self.cancelled.append(url)
+                raise
+        return url
+
+
+def _warmed_up(pool: BackendPool) -> BackendPool:
+    """Give the pool enough latency samples to compute a hedge delay."""
+    for backend in pool.backends:
+        for _ in range(MIN_HEDGE_SAMPLES):
+            pool._record_success(backend, 0.001)
+    return pool
+
+
+def test_hedging_answers_from_second_backend_when_first_stalls():
+    pool = _warmed_up(BackendPool(urls=[SLOW, FAST], hedging=True, hedge_percentile=50, hedge_min_delay=0.001))
+    stubs = StallingBackends(stalled={SLOW})
+
+    async def run() -> str | None:
+        # The stalled backend never answers, only the hedge can complete the request
+        result: str | None = await asyncio.wait_for(pool.request(stubs), timeout=10)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == FAST
+    assert stubs.calls == [SLOW, FAST]
+    # The losing attempt is cancelled rather than left running
+    assert stubs.cancelled == [SLOW]
+
+
+@pytest.mark.parametrize(
+    "pool",
+    [
+        _warmed_up(BackendPool(urls=[SLOW, FAST], hedging=False)),
+        # Without enough latency samples there is no hedge delay yet
+        BackendPool(urls=[SLOW, FAST], hedging=True, hedge_min_delay=0.001),
+    ],
+    ids=["disabled", "cold"],
+)
+def test_no_hedge_waits_for_the_first_backend(pool: BackendPool):
+    stubs = StallingBackends(stalled={SLOW})
+
+    async def run() -> str | None:
+        request = asyncio.create_task(pool.request(stubs))
+        await asyncio.sleep(0.01)
+        # With no hedge delay the pool waits without a timeout, no second attempt can start
+        assert stubs.calls == [SLOW]
+        stubs.release.set()
+        return await request
+
+    assert asyncio.run(run()) == SLOW
@@ -33,3 +33,44 @@ def test_load_invalid_config():
     config_data = yaml.safe_load(invalid_yaml)
     with pytest.raises(ValidationError):
         Config.model_validate(config_data)
+
+
+def test_single_wakeword_fields_are_the_default_list():
+    config = Config(name_wakeword_model="hey_loona", path_or_name_wakeword_model="hey_loona.onnx")
+    [wakeword] = config.wakewords_for_room("kitchen")
+    assert wakeword.name == "hey_loona"
+    assert wakeword.threshold == config.wakework_detection_threshold
+
+
+def test_room_wakewords_select_subset():
+    config = Config.model_validate(
+        {
+            "wakewords": [
+                {"name": "hey_nova", "path_or_name": "hey_nova.onnx", "threshold": 0.5},
+                {"name": "okay_nabu", "path_or_name": "okay_nabu.onnx", "threshold": 0.7},
+            ],
+            "room_wakewords": {"kitchen": ["okay_nabu"]},
+        }
+    )
+    assert [w.name for w in config.wakewords_for_room("kitchen")] == ["okay_nabu"]
+    assert [w.name for w in config.wakewords_for_room("office")] == ["hey_nova", "okay_nabu"]
+
+
+def test_room_wakewords_must_be_known():
+    with pytest.raises(ValidationError):
+        Config.model_validate({"room_wakewords": {"kitchen": ["okay_nabu"]}})
+    with pytest.raises(ValidationError):
+        Config.model_validate({"room_wakewords": {"kitchen": []}})
+
+
+def test_global_barge_in_threshold_is_the_default():
+    config = Config.model_validate(
+        {
+            "barge_in_threshold": 0.8,
+            "wakewords": [
+                {"name": "hey_nova", "path_or_name": "hey_nova.onnx"},
+                {"name": "okay_nabu", "path_or_name": "okay_nabu.onnx", "barge_in_threshold": 0.9},
+            ],
+        }
+    )
+    assert [w.barge_in_threshold for w in config.wakeword_models] == [0.8, 0.9]
@@ -1,6 +1,16 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+import aiomqtt
+import pytest
+from fastapi import WebSocketDisconnect
 from fastapi.testclient import TestClient
+from private_assistant_commons import messages
 
+from app import main
 from app.main import app, sup_util
+from app.utils.config import Config
 
 client = TestClient(app)
 
@@ -13,3 +23,90 @@ def test_accepts_connections_ready():
     expected_status_code = 200
     assert response.status_code == expected_status_code
     assert response.json() == {"status": "ready"}
+
+
+class FakeMqttClient:
+    def __init__(self, messages: list[aiomqtt.Message] | None = None) -> None:
+        self.subscribed: list[str] = []
+        self._messages = messages or []
+
+    async def subscribe(self, topic: str, qos: int = 0) -> None:  # noqa: ARG002
+        self.subscribed.append(topic)
+
+    async def unsubscribe(self, topic: str) -> None:
+        self.subscribed.remove(topic)
+
+    @property
+    async def messages(self) -> AsyncIterator[aiomqtt.Message]:
+        for message in self._messages:
+            yield message
+
+
+@pytest.fixture
+def bridge(monkeypatch):
+    """The bridge with room for two sessions, no models and an MQTT client that records subscriptions."""
+    mqtt_client = FakeMqttClient()
+    monkeypatch.setattr(sup_util, "_config_obj", Config(max_sessions=2))
+    monkeypatch.setattr(sup_util, "_mqtt_client", mqtt_client)
+    monkeypatch.setattr(sup_util, "inference_pool", None)
+    monkeypatch.setattr(sup_util, "create_vad_model", lambda: None)
+    monkeypatch.setattr(sup_util, "create_wakeword_model", lambda _wakewords: None)
+    yield mqtt_client
+    assert not sup_util.sessions
+
+
+def client_config(room: str) -> dict:
+    return {"samplerate": 16000, "input_channels": 1, "output_channels": 1, "chunk_size": 1280, "room": room}
+
+
+def wait_for_sessions(n_sessions: int) -> None:
+    deadline = time.monotonic() + 5
+    while len(sup_util.sessions) != n_sessions:
+        assert time.monotonic() < deadline, f"expected {n_sessions} sessions, have {len(sup_util.sessions)}"
+        time.sleep(0.01)
+
+
+def test_sessions_are_accepted_up_to_max_sessions(bridge):
+    with client.websocket_connect("/client_control") as kitchen, client.websocket_connect("/client_control") as office:
+        kitchen.send_json(client_config("kitchen"))
+        office.send_json(client_config("office"))
+        wait_for_sessions(2)
+        assert sorted(bridge.subscribed) == ["assistant/kitchen/output", "assistant/office/output"]
+        assert not sup_util.accepts_sessions
+
+        with pytest.raises(WebSocketDisconnect) as refused, client.websocket_connect("/client_control"):
+            pass
+        assert refused.value.code == 1001  # noqa: PLR2004
+
+    wait_for_sessions(0)
+    assert not bridge.subscribed
+    assert sup_util.accepts_sessions
+
+
+def mqtt_message(topic: str, text: str, mid: int) -> aiomqtt.Message:
+    payload = messages.Response(text=text).model_dump_json().encode()
+    return aiomqtt.Message(topic, payload, qos=1, retain=False, mid=mid, properties=None)
+
+
+def drain(queue: asyncio.Queue[messages.Response]) -> list[str]:
+    return [queue.get_nowait().text for _ in range(queue.qsize())]
+
+
+@pytest.mark.usefixtures("bridge")
+def test_broadcasts_reach_every_session_and_replies_only_their_room():
+    with client.websocket_connect("/client_control") as kitchen, client.websocket_connect("/client_control") as office:
+        kitchen.send_json(client_config("kitchen"))
+        office.send_json(client_config("office"))
+        wait_for_sessions(2)
+
+        mqtt_client = FakeMqttClient(
+            [
+                mqtt_message(sup_util.config_obj.broadcast_topic, "Dinner is ready.", mid=1),
+                mqtt_message("assistant/office/output", "The light is on.", mid=2),
+            ]
+        )
+        asyncio.run(main.listen(mqtt_client, sup_util))
+
+        queued = {session.client_conf.room: drain(session.output_queue) for session in sup_util.sessions}
+        assert queued == {"kitchen": ["Dinner is ready."], "office": ["Dinner is ready.", "The light is on."]}
+    wait_for_sessions(0)
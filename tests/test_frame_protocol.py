@@ -0,0 +1,80 @@
+from app.utils.frame_protocol import (
+    CLOCK_REPLY_PAYLOAD,
+    FrameChannel,
+    FrameType,
+    decode_frame,
+    encode_frame,
+)
+
+# Client clock runs 1 s ahead of the bridge, one-way network delay is 2 ms each way
+CLIENT_OFFSET_US = 1_000_000
+ONE_WAY_US = 2_000
+
+
+def _answer_probe(channel: FrameChannel, bridge_now_us: int) -> None:
+    probe = decode_frame(channel.make_probe(now_us=bridge_now_us))
+    client_receive_us = bridge_now_us + ONE_WAY_US + CLIENT_OFFSET_US
+    client_send_us = client_receive_us + 500
+    reply = encode_frame(
+        FrameType.CLOCK_REPLY,
+        probe.sequence,
+        client_send_us,
+        CLOCK_REPLY_PAYLOAD.pack(probe.timestamp_us, client_receive_us),
+    )
+    assert channel.unwrap(reply, receive_us=client_send_us - CLIENT_OFFSET_US + ONE_WAY_US) is None
+
+
+def test_legacy_protocol_passes_audio_through():
+    channel = FrameChannel(room="kitchen")
+    assert channel.unwrap(b"\x01\x02") == b"\x01\x02"
+    assert channel.wrap(b"\x03\x04") == b"\x03\x04"
+    assert not channel.probe_due()
+
+
+def test_frame_roundtrip():
+    frame = decode_frame(encode_frame(FrameType.AUDIO, 7, 123456, b"pcm"))
+    assert frame.frame_type == FrameType.AUDIO
+    expected_sequence = 7
+    assert frame.sequence == expected_sequence
+    expected_timestamp = 123456
+    assert frame.timestamp_us == expected_timestamp
+    assert frame.payload == b"pcm"
+
+
+def test_clock_offset_and_transport_delay():
+    channel = FrameChannel(room="kitchen", version=1)
+    assert channel.probe_due(now_us=0)
+    _answer_probe(channel, bridge_now_us=10_000)
+    assert channel.stats.clock_offset_us == CLIENT_OFFSET_US
+    assert channel.stats.round_trip_us == 2 * ONE_WAY_US
+
+    sent_bridge_us = 50_000
+    audio = encode_frame(FrameType.AUDIO, 1, sent_bridge_us + CLIENT_OFFSET_US, b"\x00\x00")
+    assert channel.unwrap(audio, receive_us=sent_bridge_us + ONE_WAY_US) == b"\x00\x00"
+    assert channel.stats.transport_delay_us == ONE_WAY_US
+
+
+def test_lost_frames_and_jitter():
+    channel = FrameChannel(room="kitchen", version=1)
+    for sequence, receive_us in ((1, 1_000), (2, 21_000), (5, 85_000)):
+        channel.unwrap(encode_frame(FrameType.AUDIO, sequence, sequence * 20_000, b""), receive_us=receive_us)
+    expected_received = 3
+    assert channel.stats.frames_received == expected_received
+    expected_lost = 2
+    assert channel.stats.frames_lost == expected_lost
+    assert channel.stats.jitter_us > 0
+
+
+def test_time_to_first_audio():
+    channel = FrameChannel(room="kitchen", version=1)
+    _answer_probe(channel, bridge_now_us=0)
+    channel.mark_command_end(now_us=100_000)
+    playback = encode_frame(FrameType.PLAYBACK_STARTED, 1, 900_000 + CLIENT_OFFSET_US)
+    assert channel.unwrap(playback) is None
+    expected_ttfa_us = 800_000
+    assert channel.stats.time_to_first_audio_us == expected_ttfa_us
+
+
+def test_malformed_frame_is_discarded():
+    channel = FrameChannel(room="kitchen", version=1)
+    assert channel.unwrap(b"\x01") is None
@@ -0,0 +1,56 @@
+import numpy as np
+
+from app.utils.config import WakewordModel
+from app.utils.inference import WakewordDetector, detected_wakewords, predict_wakeword
+
+WAKEWORDS = [
+    WakewordModel(name="hey_nova", path_or_name="hey_nova.onnx", threshold=0.5),
+    WakewordModel(name="okay_nabu", path_or_name="okay_nabu.onnx", threshold=0.8),
+]
+
+
+class RecordingModel:
+    def __init__(self) -> None:
+        self.calls: list[dict] = []
+
+    def predict(self, audio, **kwargs) -> dict[str, float]:  # noqa: ARG002
+        self.calls.append(kwargs)
+        return {"hey_nova": 0.1, "okay_nabu": 0.7, "alexa": 0.9}
+
+
+def test_all_wakewords_scored_in_one_pass():
+    model = RecordingModel()
+    scores = predict_wakeword(model, np.zeros(1280, dtype=np.int16), WAKEWORDS)
+    assert scores == {"hey_nova": 0.1, "okay_nabu": 0.7}
+    # openwakeword's debounce stays off, it would count scores the detector rejected
+    assert model.calls == [{}]
+
+
+def test_each_wakeword_uses_its_own_threshold():
+    assert detected_wakewords({"hey_nova": 0.6, "okay_nabu": 0.7}, WAKEWORDS) == ["hey_nova"]
+    assert detected_wakewords({"hey_nova": 0.4, "okay_nabu": 0.9}, WAKEWORDS) == ["okay_nabu"]
+    assert detected_wakewords({}, WAKEWORDS) == []
+
+
+def test_barge_in_threshold_applies_during_playback():
+    wakewords = [WakewordModel(name="hey_nova", path_or_name="hey_nova.onnx", threshold=0.5, barge_in_threshold=0.8)]
+    assert detected_wakewords({"hey_nova": 0.6}, wakewords) == ["hey_nova"]
+    assert detected_wakewords({"hey_nova": 0.6}, wakewords, during_playback=True) == []
+    assert detected_wakewords({"hey_nova": 0.9}, wakewords, during_playback=True) == ["hey_nova"]
+
+
+def test_echo_during_playback_does_not_debounce_a_real_wakeword():
+    wakewords = [WakewordModel(name="hey_nova", path_or_name="hey_nova.onnx", threshold=0.5, barge_in_threshold=0.8)]
+    detector = WakewordDetector(wakewords)
+    # The reply's echo scores above the normal threshold but below the barge-in one
+    for _ in range(10):
+        assert detector.detect({"hey_nova": 0.6}, 1280, during_playback=True) == []
+    assert detector.detect({"hey_nova": 0.9}, 1280, during_playback=True) == ["hey_nova"]
+
+
+def test_detections_are_debounced_over_scored_audio():
+    detector = WakewordDetector(WAKEWORDS, debounce_samples=3 * 1280)
+    assert detector.detect({"hey_nova": 0.9}, 1280) == ["hey_nova"]
+    assert detector.detect({"hey_nova": 0.9, "okay_nabu": 0.9}, 1280) == ["okay_nabu"]
+    assert detector.detect({"hey_nova": 0.9}, 1280) == []
+    assert detector.detect({"hey_nova": 0.9}, 1280) == ["hey_nova"]
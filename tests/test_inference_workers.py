@@ -0,0 +1,109 @@
+import asyncio
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.utils.config import Config
+from app.utils.inference_workers import REPLY, REQUEST, InferenceWorkerPool, Op, _WorkerSlot, worker_main
+from app.utils.shared_ring import SharedRing
+from app.utils.silero_vad import SileroVad
+
+
+def test_worker_vad_matches_local_vad():
+    rng = np.random.default_rng(0)
+    frames = [(rng.standard_normal(1280) * 3000).astype(np.int16).tobytes() for _ in range(3)]
+    local_vad = SileroVad(threshold=0.6, trigger_level=1)
+    expected = [local_vad.probability(frame) for frame in frames]
+
+    async def run() -> list[float]:
+        pool = InferenceWorkerPool(n_workers=2, config_obj=Config())
+        pool.start()
+        try:
+            sessions = [await pool.open_session(samplerate=16000, wakewords=Config().wakeword_models) for _ in range(2)]
+            # Sessions are sharded across both workers
+            assert sessions[0].worker is not sessions[1].worker
+            probabilities = [await sessions[0].speech_probability(frame) for frame in frames]
+            # No wakeword model is loaded yet, only the shared-memory rings count
+            ring_bytes = sessions[1].audio_ring.shm.size + sessions[1].score_ring.shm.size
+            assert await sessions[1].hibernate() == ring_bytes
+            # Remembered by the slot until the model is loaded, and reported back with the reply
+            assert sessions[1].hibernated
+            for session in sessions:
+                await session.close()
+            return probabilities
+        finally:
+            await pool.close()
+
+    np.testing.assert_allclose(asyncio.run(run()), expected, rtol=1e-5)
+
+
+def test_audio_larger_than_the_ring_is_scored_in_pieces():
+    rng = np.random.default_rng(1)
+    # Ten VAD windows against a ring of three
+    audio = (rng.standard_normal(10 * 512) * 3000).astype(np.int16).tobytes()
+    expected = SileroVad(threshold=0.6, trigger_level=1).probability(audio)
+
+    async def run() -> float:
+        pool = InferenceWorkerPool(n_workers=1, config_obj=Config(), ring_seconds=0.1)
+        pool.start()
+        try:
+            session = await pool.open_session(samplerate=16000, wakewords=Config().wakeword_models)
+            probability = await session.speech_probability(audio)
+            await session.close()
+            return probability
+        finally:
+            await pool.close()
+
+    np.testing.assert_allclose(asyncio.run(run()), expected, rtol=1e-5)
+
+
+def test_memory_counts_are_exact_above_float32_precision(monkeypatch):
+    worker_bytes = 2**24 + 1
+    monkeypatch.setattr(_WorkerSlot, "memory_op", lambda _slot, _op: worker_bytes)
+    # Attached in this process, the rings must stay registered for their owner's cleanup
+    monkeypatch.setattr(
+        SharedRing, "attach", lambda name, dtype: SharedRing(shared_memory.SharedMemory(name=name), dtype, owner=False)
+    )
+    parent_conn, child_conn = multiprocessing.Pipe()
+    # The worker loop runs in a thread here, so the patched slot applies
+    thread = threading.Thread(target=worker_main, args=(child_conn, Config()))
+    thread.start()
+    audio_ring = SharedRing.create(16, np.int16)
+    score_ring = SharedRing.create(16, np.float32)
+    try:
+        parent_conn.send_bytes(REQUEST.pack(Op.OPEN, 1, 0) + f"{audio_ring.name}\n{score_ring.name}".encode())
+        parent_conn.recv_bytes()
+        parent_conn.send_bytes(REQUEST.pack(Op.MEMORY, 1, 0))
+        _, _, n_results, _, memory_bytes = REPLY.unpack(parent_conn.recv_bytes())
+        assert (n_results, memory_bytes) == (1, worker_bytes)
+        parent_conn.send_bytes(REQUEST.pack(Op.CLOSE, 1, 0))
+        parent_conn.recv_bytes()
+    finally:
+        parent_conn.close()
+        thread.join()
+        audio_ring.close()
+        score_ring.close()
+
+
+def test_sessions_avoid_a_dead_worker():
+    async def run() -> None:
+        pool = InferenceWorkerPool(n_workers=2, config_obj=Config())
+        pool.start()
+        try:
+            orphan = await pool.open_session(samplerate=16000, wakewords=Config().wakeword_models)
+            orphan.worker.process.kill()
+            while orphan.worker.alive:
+                await asyncio.sleep(0.01)
+            # Closing a session of the dead worker releases it without raising
+            await orphan.close()
+
+            sessions = [await pool.open_session(samplerate=16000, wakewords=Config().wakeword_models) for _ in range(2)]
+            assert all(session.worker is not orphan.worker for session in sessions)
+            for session in sessions:
+                await session.close()
+        finally:
+            await pool.close()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=30))
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any
+
+from private_assistant_commons import messages
+
+from app import main
+from app.utils import speech_recognition_tools
+from app.utils.config import Config
+from tests.fakes import fake_session
+
+
+def test_barge_in_cancels_remaining_output(monkeypatch):
+    synthesis = {"closed": False}
+
+    async def slow_stream(text, config_obj, **_):  # noqa: ARG001
+        try:
+            for _ in range(10):
+                yield b"\x00\x00" * 1600
+                await asyncio.sleep(0.05)
+        finally:
+            synthesis["closed"] = True
+
+    monkeypatch.setattr(speech_recognition_tools, "stream_text_to_tts_api", slow_stream)
+    config_obj = Config(barge_in=True)
+
+    async def run() -> Any:
+        session = fake_session()
+        session.output_queue.put_nowait(messages.Response(text="A long answer."))
+        await main.process_output_queue(session, config_obj)
+        # The answer plays in the background, the loop is free to score the wakeword
+        assert main.is_streaming(session)
+        await asyncio.sleep(0.12)
+        assert main.is_playing(session)
+        await main.stop_playback(session)
+        return session
+
+    session = asyncio.run(run())
+    assert synthesis["closed"]
+    assert session.websocket.texts == ["stop_playback"]
+    assert 0 < len(session.websocket.audio) < 10  # noqa: PLR2004
+    assert not main.is_playing(session)
+
+
+def test_without_barge_in_playback_is_inline(monkeypatch):
+    async def stream(text, config_obj, **_):  # noqa: ARG001
+        yield b"\x00\x00" * 160
+
+    monkeypatch.setattr(speech_recognition_tools, "stream_text_to_tts_api", stream)
+
+    async def run() -> Any:
+        session = fake_session()
+        session.output_queue.put_nowait(messages.Response(text="Done."))
+        await main.process_output_queue(session, Config())
+        return session
+
+    session = asyncio.run(run())
+    assert session.playback is None
+    assert len(session.websocket.audio) == 1
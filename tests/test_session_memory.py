@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.utils import session_memory
+from app.utils.config import Config
+from app.utils.inference import HIBERNATED_MAX_CHUNKS, OWW_CHUNK_SAMPLES, LocalInference, WakewordRunner
+from app.utils.wakeword_gate import GateMode, WakewordGate
+
+RAW_MAXLEN = 160000
+
+
+class FakeWakewordModel:
+    """Carries openwakeword's streaming buffers at their steady-state sizes."""
+
+    def __init__(self) -> None:
+        self.preprocessor = SimpleNamespace(
+            raw_data_buffer=deque(range(1000, 1000 + RAW_MAXLEN), maxlen=RAW_MAXLEN),
+            melspectrogram_buffer=np.ones((970, 32)),
+            melspectrogram_max_len=970,
+            feature_buffer=np.ones((120, 96), dtype=np.float32),
+            feature_buffer_max_len=120,
+            raw_data_remainder=np.empty(0),
+        )
+        self.model_inputs = {"hey_nova": 16}
+        self.prediction_buffer: dict[str, deque] = {"hey_nova": deque([0.0] * 30, maxlen=30)}
+
+    def predict(self, *_, **__) -> dict[str, float]:
+        return {"hey_nova": 0.0}
+
+
+def test_hibernate_shrinks_and_wake_restores_buffers():
+    model = FakeWakewordModel()
+    runner = WakewordRunner(model, Config().wakeword_models)
+    full = runner.memory_bytes()
+
+    hibernated = runner.hibernate()
+    assert hibernated < full / 10
+    assert model.preprocessor.feature_buffer.shape[0] >= model.model_inputs["hey_nova"]
+    # Scores of small batches are computed within the hibernated buffers
+    runner.scores(np.zeros(OWW_CHUNK_SAMPLES, dtype=np.int16))
+    assert runner.hibernated
+
+    # A batch too big for the hibernated buffers wakes the model first
+    runner.scores(np.zeros(HIBERNATED_MAX_CHUNKS * OWW_CHUNK_SAMPLES, dtype=np.int16))
+    assert not runner.hibernated
+    assert model.preprocessor.raw_data_buffer.maxlen == RAW_MAXLEN
+    expected_feature_len = 120
+    assert model.preprocessor.feature_buffer_max_len == expected_feature_len
+
+
+class FakeInference:
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.hibernated = False
+
+    async def memory_bytes(self) -> int:
+        return self.size
+
+    async def hibernate(self) -> int:
+        self.size //= 10
+        self.hibernated = True
+        return self.size
+
+    async def wake(self) -> int:
+        self.hibernated = False
+        return self.size
+
+
+def fake_session(room: str, idle_seconds: float, size: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        client_conf=SimpleNamespace(room=room),
+        inference=FakeInference(size),
+        gate=SimpleNamespace(preroll_bytes=0),
+        last_activity=time.monotonic() - idle_seconds,
+        memory=None,
+    )
+
+
+def test_reclaim_hibernates_idle_sessions():
+    idle = fake_session("kitchen", idle_seconds=600, size=1000)
+    busy = fake_session("office", idle_seconds=1, size=1000)
+    total, exceeded = asyncio.run(session_memory.reclaim([idle, busy], idle_seconds=300, budget_bytes=0))
+    assert idle.inference.hibernated
+    assert not busy.inference.hibernated
+    expected_total = 1100
+    assert total == expected_total
+    assert not exceeded
+
+
+def test_reclaim_enforces_budget_longest_idle_first():
+    sessions = [fake_session(f"room{i}", idle_seconds=10 * i, size=1000) for i in range(3)]
+    total, exceeded = asyncio.run(session_memory.reclaim(sessions, idle_seconds=0, budget_bytes=2500))
+    assert [s.inference.hibernated for s in sessions] == [False, False, True]
+    expected_total = 2100
+    assert total == expected_total
+    assert not exceeded
+
+    _, exceeded = asyncio.run(session_memory.reclaim(sessions, idle_seconds=0, budget_bytes=100))
+    assert all(s.inference.hibernated for s in sessions)
+    assert exceeded
+
+
+def test_mark_active_wakes_session():
+    session = fake_session("kitchen", idle_seconds=600, size=1000)
+    session.inference.hibernated = True
+    asyncio.run(session_memory.mark_active(session))
+    assert not session.inference.hibernated
+    assert time.monotonic() - session.last_activity < 1
+
+
+class ClosingInference(FakeInference):
+    """Closes another session while it is being hibernated, like a disconnect mid-sweep."""
+
+    def __init__(self, size: int, sessions: list, closed: SimpleNamespace) -> None:
+        super().__init__(size)
+        self.sessions = sessions
+        self.closed = closed
+
+    async def hibernate(self) -> int:
+        self.sessions.remove(self.closed)
+        return await super().hibernate()
+
+
+class ClosedInference(FakeInference):
+    async def hibernate(self) -> int:
+        raise RuntimeError("Inference session is closed")
+
+
+def test_reclaim_skips_sessions_closed_during_the_sweep() -> None:
+    sessions: list = []
+    closed = fake_session("office", idle_seconds=500, size=1000)
+    closing = fake_session("kitchen", idle_seconds=600, size=1000)
+    closing.inference = ClosingInference(1000, sessions, closed)
+    sessions.extend([closing, closed])
+    total, _ = asyncio.run(session_memory.reclaim(sessions, idle_seconds=300, budget_bytes=0))
+    assert closing.inference.hibernated
+    assert not closed.inference.hibernated
+    expected_total = 100
+    assert total == expected_total
+
+
+def test_reclaim_continues_after_a_failing_session():
+    failing = fake_session("kitchen", idle_seconds=600, size=1000)
+    failing.inference = ClosedInference(1000)
+    idle = fake_session("office", idle_seconds=500, size=1000)
+    total, exceeded = asyncio.run(session_memory.reclaim([failing, idle], idle_seconds=300, budget_bytes=1500))
+    assert not failing.inference.hibernated
+    assert idle.inference.hibernated
+    expected_total = 1100
+    assert total == expected_total
+    assert not exceeded
+
+
+def test_session_woken_by_a_preroll_replay_is_hibernated_again():
+    gate = WakewordGate(mode=GateMode.ENERGY, preroll_samples=HIBERNATED_MAX_CHUNKS * OWW_CHUNK_SAMPLES)
+    session = SimpleNamespace(
+        client_conf=SimpleNamespace(room="kitchen"),
+        inference=LocalInference(FakeWakewordModel(), None, Config().wakeword_models),
+        gate=gate,
+        last_activity=time.monotonic() - 600,
+        memory=None,
+    )
+
+    async def run() -> None:
+        await session_memory.reclaim([session], idle_seconds=300, budget_bytes=0)
+        assert session.inference.hibernated
+
+        for _ in range(HIBERNATED_MAX_CHUNKS):
+            assert await gate.process(np.zeros(OWW_CHUNK_SAMPLES, dtype=np.int16)) is None
+        replay = await gate.process(np.full(OWW_CHUNK_SAMPLES, 2000, dtype=np.int16))
+        assert replay is not None
+        # Scoring the replay wakes the model without going through mark_active
+        await session.inference.wakeword_scores(replay)
+        assert not session.inference.hibernated
+
+        await session_memory.reclaim([session], idle_seconds=300, budget_bytes=0)
+        assert session.inference.hibernated
+        assert session.memory.hibernated
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from app.utils.shared_ring import SharedRing
+
+
+def test_write_read_wraps_around():
+    ring = SharedRing.create(capacity=8, dtype=np.int16)
+    try:
+        ring.write(np.arange(6, dtype=np.int16))
+        np.testing.assert_array_equal(ring.read(4), [0, 1, 2, 3])
+        ring.write(np.arange(10, 16, dtype=np.int16))
+        expected_available = 8
+        assert ring.available() == expected_available
+        np.testing.assert_array_equal(ring.read(8), [4, 5, 10, 11, 12, 13, 14, 15])
+    finally:
+        ring.close()
+
+
+def test_attached_ring_sees_writes():
+    ring = SharedRing.create(capacity=4, dtype=np.float32)
+    other = SharedRing.attach(ring.name, np.float32)
+    try:
+        ring.write(np.array([0.5, 0.25], dtype=np.float32))
+        np.testing.assert_allclose(other.read(2), [0.5, 0.25])
+        assert ring.available() == 0
+    finally:
+        other.close()
+        ring.close()
+
+
+def test_overflow_and_underflow():
+    ring = SharedRing.create(capacity=2, dtype=np.int16)
+    try:
+        with pytest.raises(ValueError):
+            ring.write(np.zeros(3, dtype=np.int16))
+        with pytest.raises(ValueError):
+            ring.read(1)
+    finally:
+        ring.close()
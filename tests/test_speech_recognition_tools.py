@@ -1,6 +1,11 @@
+import asyncio
+import time
+
 import numpy as np
 
-from app.utils.speech_recognition_tools import int2float
+from app.utils import speech_recognition_tools
+from app.utils.config import Config
+from app.utils.speech_recognition_tools import int2float, split_sentences, stream_text_to_tts_api
 
 
 def test_int2float():
@@ -23,3 +28,64 @@ def test_int2float():
     int_sound = np.array([16384], dtype=np.int16)
     expected_float_sound = np.array([0.5], dtype=np.float32)
     np.testing.assert_allclose(int2float(int_sound), expected_float_sound, rtol=1e-4, atol=1e-6)
+
+
+def test_split_sentences():
+    text = "Ok. The weather in Berlin is sunny today! Tomorrow it will rain, so take an umbrella?"
+    assert split_sentences(text) == [
+        "Ok.",
+        "The weather in Berlin is sunny today!",
+        "Tomorrow it will rain, so take an umbrella?",
+    ]
+    # Short fragments are merged into the next sentence
+    assert split_sentences(text, min_segment_chars=10)[0] == "Ok. The weather in Berlin is sunny today!"
+    assert split_sentences("  ") == []
+
+
+def test_split_sentences_keeps_abbreviations_and_clauses_together():
+    text = "Dr. Smith called, e.g. About the invoice. Note: the office closes at 5 p.m. today; call back tomorrow."
+    assert split_sentences(text) == [
+        "Dr. Smith called, e.g. About the invoice.",
+        "Note: the office closes at 5 p.m. today; call back tomorrow.",
+    ]
+    assert split_sentences("Sunny today! Rain tomorrow?") == ["Sunny today!", "Rain tomorrow?"]
+
+
+def test_stream_text_to_tts_api_yields_first_segment_early(monkeypatch):
+    config_obj = Config(tts_max_parallel_segments=3, tts_min_segment_chars=0)
+    delays = {"First.": 0.01, "Second sentence.": 0.2, "Third.": 0.05}
+
+    async def fake_tts(text: str, *_args, **_kwargs) -> bytes:
+        await asyncio.sleep(delays[text])
+        return text.encode()
+
+    monkeypatch.setattr(speech_recognition_tools, "send_text_to_tts_api", fake_tts)
+
+    async def run() -> tuple[list[bytes], float]:
+        start = time.monotonic()
+        first_audio_after = 0.0
+        segments: list[bytes] = []
+        async for audio in stream_text_to_tts_api(" ".join(delays), config_obj):
+            if not segments:
+                first_audio_after = time.monotonic() - start
+            segments.append(audio)
+        return segments, first_audio_after
+
+    segments, first_audio_after = asyncio.run(run())
+    assert segments == [b"First.", b"Second sentence.", b"Third."]
+    max_first_audio_seconds = 0.1
+    assert first_audio_after < max_first_audio_seconds
+
+
+def test_stream_text_to_tts_api_stops_at_a_failed_segment(monkeypatch):
+    config_obj = Config(tts_max_parallel_segments=3, tts_min_segment_chars=0)
+
+    async def fake_tts(text: str, *_args, **_kwargs) -> bytes | None:
+        return None if text == "Second sentence." else text.encode()
+
+    monkeypatch.setattr(speech_recognition_tools, "send_text_to_tts_api", fake_tts)
+
+    async def run() -> list[bytes]:
+        return [audio async for audio in stream_text_to_tts_api("First. Second sentence. Third.", config_obj)]
+
+    assert asyncio.run(run()) == [b"First."]
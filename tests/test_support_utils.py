@@ -0,0 +1,27 @@
+from app.utils.config import Config
+from app.utils.support_utils import SupportUtils
+
+
+def test_sessions_until_capacity():
+    sup_util = SupportUtils()
+    sup_util.config_obj = Config(max_sessions=2)
+
+    sup_util.reserve_session()
+    assert not sup_util.websocket_connected
+    sup_util.reserve_session()
+    assert sup_util.websocket_connected
+
+    sup_util.release_session()
+    assert not sup_util.websocket_connected
+    expected_active = 1
+    assert sup_util.active_sessions == expected_active
+
+
+def test_single_session_default():
+    sup_util = SupportUtils()
+    sup_util.config_obj = Config()
+    sup_util.reserve_session()
+    assert sup_util.websocket_connected
+    sup_util.release_session()
+    sup_util.release_session()
+    assert sup_util.active_sessions == 0
@@ -0,0 +1,85 @@
+import asyncio
+from collections import deque
+
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+from private_assistant_commons import messages
+
+from app import main
+from app.utils import speech_recognition_tools, tracing
+from app.utils.config import Config
+from tests.fakes import fake_session
+
+
+def traced(sample_rate: float = 1.0) -> tuple[InMemorySpanExporter, tracing.CommandTrace]:
+    exporter = InMemorySpanExporter()
+    tracer = tracing.create_tracer_provider(sample_rate, exporter).get_tracer(__name__)
+    return exporter, tracing.CommandTrace(tracer, "kitchen", ["hey_nova"])
+
+
+def test_command_round_trip_is_one_trace(monkeypatch):
+    async def stream(text, config_obj, **_):  # noqa: ARG001
+        yield b"\x00\x00" * 160
+        yield b"\x00\x00" * 160
+
+    monkeypatch.setattr(speech_recognition_tools, "stream_text_to_tts_api", stream)
+    exporter, command_trace = traced()
+    session = fake_session()
+
+    with command_trace.span("stt"):
+        pass
+    command_trace.await_response("request-1")
+    tracing.track(session.traces, command_trace)
+    response = messages.Response(text="It is sunny.")
+    tracing.match_response(session.traces, response)
+    asyncio.run(main.play_response(session, response, Config()))
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert set(spans) == {"command", "stt", "assistant", "tts"}
+    root = spans["command"]
+    assert root.attributes is not None
+    assert root.attributes["request_id"] == "request-1"
+    assert {span.context.trace_id for span in spans.values()} == {root.context.trace_id}
+    assert all(
+        span.parent is not None and span.parent.span_id == root.context.span_id
+        for span in spans.values()
+        if span is not root
+    )
+    expected_segments = 2
+    assert len(spans["tts"].events) == expected_segments
+    assert not session.traces
+
+
+def test_unanswered_commands_are_ended_as_errors() -> None:
+    exporter = InMemorySpanExporter()
+    traces: deque[tracing.CommandTrace] = deque()
+    tracer = tracing.create_tracer_provider(1.0, exporter).get_tracer(__name__)
+    for i in range(tracing.MAX_PENDING_TRACES + 1):
+        command_trace = tracing.CommandTrace(tracer, "kitchen", ["hey_nova"])
+        command_trace.await_response(f"request-{i}")
+        tracing.track(traces, command_trace)
+
+    assert len(traces) == tracing.MAX_PENDING_TRACES
+    [root] = [span for span in exporter.get_finished_spans() if span.name == "command"]
+    assert root.status.status_code == StatusCode.ERROR
+
+
+def test_unsampled_commands_export_nothing():
+    exporter, command_trace = traced(sample_rate=0.0)
+    with command_trace.span("stt"):
+        pass
+    command_trace.end()
+    assert not exporter.get_finished_spans()
+
+
+def test_recent_span_exporter_groups_by_trace():
+    exporter = tracing.RecentSpanExporter(max_spans=10)
+    tracer = tracing.create_tracer_provider(1.0, exporter).get_tracer(__name__)
+    command_trace = tracing.CommandTrace(tracer, "kitchen", ["hey_nova"])
+    with command_trace.span("stt"):
+        pass
+    command_trace.end()
+
+    [spans] = exporter.traces().values()
+    assert [span["name"] for span in spans] == ["stt", "command"]
+    assert spans[0]["parent_id"] == spans[1]["span_id"]
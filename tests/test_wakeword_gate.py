@@ -0,0 +1,133 @@
+import asyncio
+from typing import TYPE_CHECKING, cast
+
+import numpy as np
+import pytest
+
+from app import main
+from app.utils import silero_vad
+from app.utils.client_config import ClientConfig
+from app.utils.config import Config
+from app.utils.wakeword_gate import GateMode, WakewordGate, frame_rms
+
+if TYPE_CHECKING:
+    from app.utils.inference import Inference
+
+CHUNK = 1280
+
+
+def _silence() -> np.ndarray:
+    return np.zeros(CHUNK, dtype=np.int16)
+
+
+def _speech() -> np.ndarray:
+    return np.full(CHUNK, 2000, dtype=np.int16)
+
+
+def process(gate: WakewordGate, audio: np.ndarray) -> np.ndarray | None:
+    return asyncio.run(gate.process(audio))
+
+
+def test_frame_rms():
+    assert frame_rms(_silence()) == 0.0
+    expected_rms = 2000.0
+    assert frame_rms(_speech()) == pytest.approx(expected_rms)
+
+
+def test_gate_off_scores_every_frame():
+    gate = WakewordGate(mode=GateMode.OFF)
+    frame = _silence()
+    assert process(gate, frame) is frame
+
+
+def test_silence_is_skipped_and_replayed_as_preroll():
+    gate = WakewordGate(mode=GateMode.ENERGY, preroll_samples=3 * CHUNK, hangover_samples=2 * CHUNK)
+    for _ in range(10):
+        assert process(gate, _silence()) is None
+
+    scored = process(gate, _speech())
+    assert scored is not None
+    # Three frames of pre-roll context plus the frame that opened the gate
+    assert scored.size == 4 * CHUNK
+    assert np.all(scored[-CHUNK:] == 2000)  # noqa: PLR2004
+    expected_scored = 1
+    assert gate.frames_scored == expected_scored
+
+
+def test_zero_preroll_keeps_no_silence():
+    gate = WakewordGate(mode=GateMode.ENERGY, preroll_samples=0, hangover_samples=0)
+    for _ in range(3):
+        assert process(gate, _silence()) is None
+    assert gate.preroll_bytes == 0
+
+    speech = _speech()
+    assert process(gate, speech) is speech
+
+
+def test_hangover_keeps_gate_open():
+    gate = WakewordGate(mode=GateMode.ENERGY, hangover_samples=2 * CHUNK)
+    assert process(gate, _speech()) is not None
+    assert process(gate, _silence()) is not None
+    assert process(gate, _silence()) is not None
+    assert process(gate, _silence()) is None
+
+
+def test_reset_drops_preroll():
+    gate = WakewordGate(mode=GateMode.ENERGY, hangover_samples=0)
+    process(gate, _silence())
+    gate.reset()
+    scored = process(gate, _speech())
+    assert scored is not None
+    assert scored.size == CHUNK
+
+
+def test_vad_mode_consults_vad_only_above_energy() -> None:
+    calls: list[bytes] = []
+
+    async def vad(audio: bytes) -> float:
+        calls.append(audio)
+        return 0.9
+
+    gate = WakewordGate(mode=GateMode.ENERGY_AND_VAD, vad_probability=vad)
+    assert process(gate, _silence()) is None
+    assert not calls
+    assert process(gate, _speech()) is not None
+    assert len(calls) == 1
+
+
+def test_vad_gets_whole_windows_with_the_tail_carried_over() -> None:
+    window = 512
+    calls: list[int] = []
+
+    async def vad(audio: bytes) -> float:
+        calls.append(len(audio) // 2)
+        return 0.0
+
+    gate = WakewordGate(mode=GateMode.VAD, vad_probability=vad, vad_window_samples=window)
+    for _ in range(2):
+        process(gate, _speech())
+    # 1280 samples are two windows with 256 left over, which complete a third window next time
+    assert calls == [2 * window, 3 * window]
+
+
+def test_vad_mode_requires_vad():
+    with pytest.raises(ValueError):
+        WakewordGate(mode=GateMode.VAD)
+
+
+def test_session_gate_asks_the_session_inference() -> None:
+    calls: list[int] = []
+
+    class RecordingInference:
+        async def speech_probability(self, audio_bytes: bytes) -> float:
+            calls.append(len(audio_bytes) // 2)
+            return 0.9
+
+    config_obj = Config(wakeword_gate_mode=GateMode.VAD)
+    client_conf = ClientConfig(samplerate=16000, input_channels=1, output_channels=1, chunk_size=CHUNK, room="kitchen")
+    # Only speech_probability is used by the gate
+    session_inference = cast("Inference", RecordingInference())
+    gate = main.create_wakeword_gate(config_obj, client_conf, session_inference)
+    assert process(gate, _speech()) is not None
+    # In worker mode speech_probability runs in the worker, not on the event loop
+    assert calls == [2 * silero_vad.CHUNK_SAMPLES]